@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+"""
+Martin Guthrie
+
+DPG backends, the widget classes (Logger, Table, ToggleButton, ...) call the
+module they import as dpg, which is dearpygui.dearpygui, install() swaps it
+for a RecordingDPG, an in memory stand-in that needs no display or GPU, and
+counts and times every call,
+
+    import dpg_backend
+    rec = dpg_backend.install(dpg_backend.RecordingDPG())  # before importing the widgets
+    from logger_klass import Logger
+    ...
+    print("\\n".join(rec.report()))
+    dpg_backend.uninstall()
+
+install(backend, modules=[logger_klass, ...]) also swaps dpg in modules that
+are already imported.  See logger_bench.py --stub.
+
+"""
+from threading import RLock
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from itertools import count
+import importlib
+import sys
+import time
+import types
+
+DPG_MODULE = "dearpygui.dearpygui"
+
+
+class _Item(object):
+    __slots__ = ("tag", "type", "parent", "children", "config", "value")
+
+    def __init__(self, tag, type, parent, config, value):
+        self.tag = tag
+        self.type = type
+        self.parent = parent
+        self.children = {0: [], 1: [], 2: [], 3: []}  # slots, like DPG
+        self.config = config
+        self.value = value
+
+
+def _recorded(name, fn):
+    def call(self, *args, **kwargs):
+        with self._lock:
+            t0 = time.perf_counter()
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - t0
+                self.calls[name] += 1
+
+    call.__name__ = name
+    call.__doc__ = fn.__doc__
+    return call
+
+
+class RecordingDPG(object):
+    """ In memory stand-in for dearpygui.dearpygui
+    - items are kept in a tree, with their configuration, value, theme and
+      font, so code that reads back what it set works, nothing is drawn
+    - calls counts and seconds are the number of calls and the time spent in
+      each DPG function, see stats() and report(), ie to catch a change that
+      doubles the configure_item() calls per log line
+    - the functions the widget classes use are implemented, other add_*()
+      functions create a plain item, other functions do nothing and return
+      None, mv* constants are stable ints, all of them are counted
+    - thread safe, calls are serialized, like DPG's own lock
+
+    """
+
+    CONTAINERS = ("window", "child_window", "group", "table", "table_row", "theme", "theme_component",
+                  "font_registry", "item_handler_registry", "handler_registry", "texture_registry",
+                  "value_registry", "tab_bar", "tab", "collapsing_header", "tree_node", "menu_bar",
+                  "menu", "popup", "plot", "subplots", "node_editor", "node", "node_attribute",
+                  "filter_set", "clipper", "drawlist", "viewport_drawlist", "stage", "template_registry")
+
+    def __init__(self):
+        self._lock = RLock()
+        self._constants = {}
+        self.calls = Counter()
+        self.seconds = defaultdict(float)
+        self._uuid = count(1000)  # not reset with the context, uuids are never reused
+        self._reset_items()
+
+    def _reset_items(self):
+        self._items = {}
+        self._stack = []
+        self._last_item = None
+        self._last_container = None
+
+    # ---- recording
+
+    def stats(self):
+        """ {function name: {"calls": n, "seconds": s}}, most called first """
+        with self._lock:
+            return {name: {"calls": n, "seconds": self.seconds[name]} for name, n in self.calls.most_common()}
+
+    def report(self, top=None):
+        """ lines of calls, total and mean time per DPG function """
+        lines = []
+        for name, s in list(self.stats().items())[:top]:
+            lines.append(f"{name:32s} {s['calls']:10,d} calls {s['seconds'] * 1000:10,.3f} ms "
+                         f"{s['seconds'] * 1e6 / s['calls']:8,.2f} us/call")
+        return lines
+
+    def reset(self):
+        """ zero the counts and times, the items are kept """
+        with self._lock:
+            self.calls.clear()
+            self.seconds.clear()
+
+    def item_count(self):
+        with self._lock:
+            return len(self._items)
+
+    # ---- items
+
+    def _new_tag(self):
+        return next(self._uuid)
+
+    def _parent(self, kwargs):
+        parent = kwargs.pop("parent", 0) or (self._stack[-1] if self._stack else None)
+        if parent is not None and parent not in self._items:
+            raise SystemError(f"parent {parent} does not exist")
+        return parent
+
+    def _add(self, type, kwargs, value=None):
+        kwargs = dict(kwargs)
+        tag = kwargs.pop("tag", 0) or kwargs.pop("id", 0) or self._new_tag()
+        if tag in self._items:
+            raise SystemError(f"item {tag} already exists")
+
+        parent = self._parent(kwargs)
+        kwargs.pop("before", None)
+        if "default_value" in kwargs:
+            value = kwargs.pop("default_value")
+        kwargs.setdefault("show", True)
+
+        self._items[tag] = _Item(tag, type, parent, kwargs, value)
+        if parent is not None:
+            self._items[parent].children[0 if type == "table_column" else 1].append(tag)
+        self._last_item = tag
+        if type in self.CONTAINERS:
+            self._last_container = tag
+        return tag
+
+    def _item(self, item):
+        try:
+            return self._items[item]
+        except KeyError:
+            raise SystemError(f"item {item} does not exist") from None
+
+    @contextmanager
+    def _container(self, type, kwargs):
+        tag = self._add(type, kwargs)
+        self._stack.append(tag)
+        try:
+            yield tag
+        finally:
+            self._stack.pop()
+
+    def _delete(self, tag):
+        item = self._items.pop(tag)
+        for slot in item.children.values():
+            for child in slot:
+                self._delete(child)
+
+    def __getattr__(self, name):
+        # only called for names that are not implemented below
+        if name.startswith("mv"):
+            return self._constants.setdefault(name, len(self._constants) + 1)
+
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        if name.startswith("add_"):
+            type = name[4:]
+            fn = _recorded(name, lambda self, *args, **kwargs: self._add(type, kwargs))
+        elif name in self.CONTAINERS:
+            fn = _recorded(name, lambda self, *args, **kwargs: self._container(name, kwargs))
+        else:
+            fn = _recorded(name, lambda self, *args, **kwargs: None)
+
+        fn = types.MethodType(fn, self)
+        setattr(self, name, fn)  # found without __getattr__ next time
+        return fn
+
+    # ---- context and viewport
+
+    def create_context(self):
+        self._reset_items()
+
+    def destroy_context(self):
+        self._reset_items()
+
+    def create_viewport(self, **kwargs):
+        pass
+
+    def setup_dearpygui(self):
+        pass
+
+    def show_viewport(self, **kwargs):
+        pass
+
+    def start_dearpygui(self):
+        pass  # returns at once, there is no render loop
+
+    def is_dearpygui_running(self):
+        return False
+
+    def get_dearpygui_version(self):
+        return "recording"
+
+    def generate_uuid(self):
+        return self._new_tag()
+
+    # ---- containers
+
+    def window(self, **kwargs):
+        return self._container("window", kwargs)
+
+    def child_window(self, **kwargs):
+        return self._container("child_window", kwargs)
+
+    def group(self, **kwargs):
+        return self._container("group", kwargs)
+
+    def table(self, **kwargs):
+        kwargs.setdefault("highlight_rows", {})
+        kwargs.setdefault("highlight_cells", {})
+        return self._container("table", kwargs)
+
+    def table_row(self, **kwargs):
+        return self._container("table_row", kwargs)
+
+    def theme(self, **kwargs):
+        return self._container("theme", kwargs)
+
+    def theme_component(self, item_type=0, **kwargs):
+        kwargs["item_type"] = item_type
+        return self._container("theme_component", kwargs)
+
+    def font_registry(self, **kwargs):
+        return self._container("font_registry", kwargs)
+
+    def item_handler_registry(self, **kwargs):
+        return self._container("item_handler_registry", kwargs)
+
+    def push_container_stack(self, item):
+        self._item(item)
+        self._stack.append(item)
+        return True
+
+    def pop_container_stack(self):
+        return self._stack.pop() if self._stack else None
+
+    def top_container_stack(self):
+        return self._stack[-1] if self._stack else None
+
+    def last_item(self):
+        return self._last_item
+
+    def last_container(self):
+        return self._last_container
+
+    # ---- widgets
+
+    def add_text(self, default_value="", **kwargs):
+        return self._add("text", kwargs, default_value)
+
+    def add_selectable(self, **kwargs):
+        return self._add("selectable", kwargs, False)
+
+    def add_button(self, **kwargs):
+        return self._add("button", kwargs)
+
+    def add_table_column(self, **kwargs):
+        return self._add("table_column", kwargs)
+
+    def add_theme_color(self, target=0, value=(0, 0, 0, 255), **kwargs):
+        kwargs["target"] = target
+        return self._add("theme_color", kwargs, value)
+
+    def add_theme_style(self, target=0, x=1.0, y=-1.0, **kwargs):
+        kwargs.update(target=target, x=x, y=y)
+        return self._add("theme_style", kwargs)
+
+    def add_font(self, file, size, **kwargs):
+        kwargs.update(file=file, size=size)
+        return self._add("font", kwargs)
+
+    # ---- items
+
+    def does_item_exist(self, item):
+        return item in self._items
+
+    def delete_item(self, item, children_only=False, slot=-1):
+        it = self._item(item)
+        if children_only:
+            for s, children in it.children.items():
+                if slot in (-1, s):
+                    for child in children:
+                        self._delete(child)
+                    children.clear()
+            return
+
+        self._delete(item)
+        if it.parent is not None and it.parent in self._items:
+            for children in self._items[it.parent].children.values():
+                if item in children:
+                    children.remove(item)
+
+    def get_item_children(self, item, slot=-1):
+        children = self._item(item).children
+        if slot == -1:
+            return {s: list(c) for s, c in children.items()}
+        return list(children[slot])
+
+    def get_item_parent(self, item):
+        return self._item(item).parent
+
+    def get_item_type(self, item):
+        return f"mvAppItemType::mv{self._item(item).type}"
+
+    def configure_item(self, item, **kwargs):
+        self._item(item).config.update(kwargs)
+
+    def get_item_configuration(self, item):
+        return dict(self._item(item).config)
+
+    def get_item_label(self, item):
+        return self._item(item).config.get("label")
+
+    def set_item_label(self, item, label):
+        self._item(item).config["label"] = label
+
+    def set_item_user_data(self, item, user_data):
+        self._item(item).config["user_data"] = user_data
+
+    def get_item_user_data(self, item):
+        return self._item(item).config.get("user_data")
+
+    def show_item(self, item):
+        self._item(item).config["show"] = True
+
+    def hide_item(self, item):
+        self._item(item).config["show"] = False
+
+    def is_item_shown(self, item):
+        return bool(self._item(item).config.get("show", True))
+
+    def set_value(self, item, value):
+        self._item(item).value = value
+
+    def get_value(self, item):
+        return self._item(item).value
+
+    def bind_item_theme(self, item, theme):
+        if theme:  # 0 unbinds, like DPG
+            self._item(theme)
+        self._item(item).config["theme"] = theme
+
+    def bind_item_font(self, item, font):
+        if font:
+            self._item(font)
+        self._item(item).config["font"] = font
+
+    def bind_item_handler_registry(self, item, handler_registry):
+        self._item(item).config["handler_registry"] = handler_registry
+
+    def bind_theme(self, theme):
+        if theme:
+            self._item(theme)
+        self._global_theme = theme
+
+    def bind_font(self, font):
+        if font:
+            self._item(font)
+        self._global_font = font
+
+    # ---- tables and scrolling
+
+    def highlight_table_row(self, table, row, color):
+        self._item(table).config.setdefault("highlight_rows", {})[row] = color
+
+    def unhighlight_table_row(self, table, row):
+        self._item(table).config.setdefault("highlight_rows", {}).pop(row, None)
+
+    def highlight_table_cell(self, table, row, column, color):
+        self._item(table).config.setdefault("highlight_cells", {})[(row, column)] = color
+
+    def unhighlight_table_cell(self, table, row, column):
+        self._item(table).config.setdefault("highlight_cells", {}).pop((row, column), None)
+
+    def set_y_scroll(self, item, value):
+        self._item(item).config["y_scroll"] = value
+
+    def get_y_scroll(self, item):
+        return max(0.0, self._item(item).config.get("y_scroll", 0.0))
+
+    def get_y_scroll_max(self, item):
+        return 0.0
+
+
+# every public function is counted and timed
+for _name, _fn in list(vars(RecordingDPG).items()):
+    if callable(_fn) and not _name.startswith("_") and _name not in ("stats", "report", "reset", "item_count"):
+        setattr(RecordingDPG, _name, _recorded(_name, _fn))
+
+
+_saved = None  # (sys.modules entries, {module: dpg}) replaced by install()
+
+
+def install(backend, modules=()):
+    """ Use backend as dearpygui.dearpygui
+    - modules imported after this get backend when they import dearpygui.dearpygui,
+      dearpygui does not need to be installed
+    - modules, already imported modules whose dpg global is replaced
+
+    :param backend: RecordingDPG, or a module like object
+    :param modules: list of modules
+    :return: backend
+    """
+    global _saved
+    if _saved is not None:
+        uninstall()
+
+    entries = {name: sys.modules.get(name) for name in ("dearpygui", DPG_MODULE)}
+    package = entries["dearpygui"]
+    if package is None:
+        try:
+            package = importlib.import_module("dearpygui")
+        except ImportError:
+            package = types.ModuleType("dearpygui")
+            package.__path__ = []
+        sys.modules["dearpygui"] = package
+
+    _saved = (entries, {m: m.dpg for m in modules}, getattr(package, "dearpygui", None))
+    sys.modules[DPG_MODULE] = backend
+    package.dearpygui = backend
+    for m in modules:
+        m.dpg = backend
+    return backend
+
+
+def uninstall():
+    """ Undo install(), modules imported while it was installed keep the backend """
+    global _saved
+    if _saved is None:
+        return
+
+    entries, modules, attr = _saved
+    package = sys.modules["dearpygui"]
+    if attr is None:
+        del package.dearpygui
+    else:
+        package.dearpygui = attr
+    for name, module in entries.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    for m, dpg in modules.items():
+        m.dpg = dpg
+    _saved = None
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Logger benchmarks, headless, the DPG context is never shown
+
+Measures, for each number of rows,
+- ingest, lines/sec from log_*() through the Logger thread into the table
+- filter, latency of _cb_combo_level() and _cb_combo_sources()
+- export, rows/sec and bytes/sec of an export of all the rows
+- clear, time of clear()
+- peak RSS of the process, rows are run smallest first
+- with --stub, DPG is a dpg_backend.RecordingDPG, the number of DPG calls of
+  each step is recorded too, no display is needed (or dearpygui installed)
+
+Results are written as JSON, compare two runs with --compare,
+
+    python logger_bench.py --rows 10000,100000 --out before.json
+    python logger_bench.py --rows 10000,100000 --out after.json --compare before.json
+
+"""
+import dpg_backend
+try:
+    import dearpygui.dearpygui as dpg
+except ImportError:  # ie CI without dearpygui, --stub is implied
+    dpg = dpg_backend.install(dpg_backend.RecordingDPG())
+import logger_klass
+import theme_klass
+import worker_metrics
+from logger_klass import Logger
+from theme_klass import Themes
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+
+class LogGenerator(object):
+    """ Synthetic log lines, the same lines for the same seed
+    - sources are SOURCE_PREFIX + n, levels are weighted like a real log,
+      mostly INFO and DEBUG
+    """
+
+    SOURCE_PREFIX = "SRC"
+    LEVEL_WEIGHTS = ((Logger.LOG_LEVEL_TRACE, 5), (Logger.LOG_LEVEL_DEBUG, 25), (Logger.LOG_LEVEL_INFO, 50),
+                     (Logger.LOG_LEVEL_WARN, 12), (Logger.LOG_LEVEL_ERROR, 6), (Logger.LOG_LEVEL_CRITICAL, 2))
+    WORDS = ("uart", "rx", "tx", "frame", "crc", "ok", "timeout", "retry", "volts", "amps",
+             "temp", "sensor", "read", "write", "flash", "page", "erase", "boot", "ack", "nack")
+
+    def __init__(self, seed=1, sources=8, words=8):
+        self._random = random.Random(seed)
+        self._sources = [f"{self.SOURCE_PREFIX}{n}" for n in range(sources)]
+        self._levels = [level for level, _ in self.LEVEL_WEIGHTS]
+        self._weights = [weight for _, weight in self.LEVEL_WEIGHTS]
+        self._words = words
+
+    @property
+    def sources(self):
+        return list(self._sources)
+
+    def lines(self, n):
+        """ list of n (timestamp, source, level, message) """
+        r = self._random
+        sources = r.choices(self._sources, k=n)
+        levels = r.choices(self._levels, weights=self._weights, k=n)
+        return [(f"{i:09d}", sources[i], levels[i], " ".join(r.choices(self.WORDS, k=self._words)))
+                for i in range(n)]
+
+
+def peak_rss_kb():
+    """ peak resident set size of this process, kB, None if unknown """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS
+
+
+def _wait(cond, timeout, poll=0.001):
+    end = time.perf_counter() + timeout
+    while not cond():
+        if time.perf_counter() > end:
+            raise TimeoutError("benchmark step timed out")
+        time.sleep(poll)
+
+
+def _timed_ms(fn, *args, repeat=5):
+    """ min and mean ms of repeat calls of fn(*args) """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append((time.perf_counter() - t0) * 1000)
+    return {"min_ms": min(times), "mean_ms": sum(times) / len(times)}
+
+
+def _dpg_calls(result, recorder):
+    """ add the DPG calls since the last call to result, with a RecordingDPG """
+    if recorder is not None:
+        result["dpg_calls"] = {name: s["calls"] for name, s in recorder.stats().items()}
+        recorder.reset()
+
+
+def bench_rows(n, gen, tmpdir, virtual=True, batch_max=1000, timeout=600.0, recorder=None):
+    """ Run the benchmarks with n rows, in a fresh DPG context
+
+    :param n: number of log lines
+    :param gen: LogGenerator
+    :param tmpdir: directory of the export file
+    :param virtual: Logger(virtual=)
+    :param batch_max: Logger(batch_max=)
+    :param timeout: max seconds of each step
+    :param recorder: RecordingDPG when it is the DPG backend, DPG calls are counted
+    :return: dict of results
+    """
+    lines = gen.lines(n)
+    log = {Logger.LOG_LEVEL_TRACE: Logger.log_trace, Logger.LOG_LEVEL_DEBUG: Logger.log_debug,
+           Logger.LOG_LEVEL_INFO: Logger.log_info, Logger.LOG_LEVEL_WARN: Logger.log_warn,
+           Logger.LOG_LEVEL_ERROR: Logger.log_error, Logger.LOG_LEVEL_CRITICAL: Logger.log_critical}
+    export_filename = os.path.join(tmpdir, f"bench_{n}.txt")
+
+    dpg.create_context()
+    try:
+        with dpg.window(label="Logger", width=600, height=600):
+            lg = Logger(tag_root=f"bench{n}", export_filename=export_filename,
+                        virtual=virtual, batch_max=batch_max)
+
+        result = {"rows": n, "virtual": virtual, "batch_max": batch_max}
+        _dpg_calls({}, recorder)
+
+        # ingest, log_* on this thread, until the last line is in the table
+        t0 = time.perf_counter()
+        for timestamp, source, level, message in lines:
+            log[level](lg, timestamp, source, message)
+        t_queued = time.perf_counter()
+        _wait(lambda: lg._rows.end >= n, timeout)
+        t_done = time.perf_counter()
+        result["ingest"] = {"seconds": t_done - t0,
+                            "lines_per_s": n / (t_done - t0),
+                            "enqueue_lines_per_s": n / (t_queued - t0)}
+        _dpg_calls(result["ingest"], recorder)
+
+        # filters, called the way DPG calls them, on this thread
+        levels = [v["str"] for v in lg.LOG_LEVEL_MAP.values()]
+        result["filter_level"] = _timed_ms(lambda: [lg._cb_combo_level(None, s, None) for s in ("ERROR", "TRACE")])
+        result["filter_level"]["calls"] = 2
+        _dpg_calls(result["filter_level"], recorder)
+        result["filter_sources"] = _timed_ms(lambda: [lg._cb_combo_sources(None, s, None)
+                                                      for s in ("ALL_OFF", "ALL_ON", gen.sources[0], gen.sources[0])])
+        result["filter_sources"]["calls"] = 4
+        _dpg_calls(result["filter_sources"], recorder)
+        lg._cb_combo_level(None, levels[0], None)  # show all rows for the export
+
+        # export, queued like the Export button, until the file is closed, the
+        # export modal text changes from "Exporting ..." when it is done
+        t0 = time.perf_counter()
+        lg._cb_button_export(None, None, None)
+        _wait(lambda: lg._export_ui is not None and not dpg.get_value(lg._export_ui[0]).startswith("Exporting"),
+              timeout)
+        seconds = time.perf_counter() - t0
+        if dpg.get_value(lg._export_ui[0]) != export_filename:
+            raise RuntimeError(dpg.get_value(lg._export_ui[0]))
+        size = os.path.getsize(export_filename)
+        result["export"] = {"seconds": seconds, "rows_per_s": n / seconds,
+                            "bytes": size, "bytes_per_s": size / seconds}
+        os.remove(export_filename)
+
+        # clear, the Logger thread is idle
+        t0 = time.perf_counter()
+        lg.clear()
+        result["clear_ms"] = (time.perf_counter() - t0) * 1000
+
+        result["peak_rss_kb"] = peak_rss_kb()
+
+        lg.shutdown()
+        lg.join(timeout)
+
+    finally:
+        dpg.destroy_context()
+        Themes.clear()  # the themes died with the context, the next run builds them again
+
+    return result
+
+
+def compare(old, new):
+    """ lines of new / old ratios of the headline numbers, > 1.0 is better """
+    metrics = (("ingest lines/s", lambda r: r["ingest"]["lines_per_s"], False),
+               ("ingest dpg calls", lambda r: sum(r["ingest"].get("dpg_calls", {}).values()), True),
+               ("filter level ms", lambda r: r["filter_level"]["min_ms"], True),
+               ("filter sources ms", lambda r: r["filter_sources"]["min_ms"], True),
+               ("export rows/s", lambda r: r["export"]["rows_per_s"], False),
+               ("clear ms", lambda r: r["clear_ms"], True),
+               ("peak rss kB", lambda r: r["peak_rss_kb"] or 0, True))
+
+    old_rows = {r["rows"]: r for r in old["results"]}
+    out = []
+    for r in new["results"]:
+        o = old_rows.get(r["rows"])
+        if o is None:
+            continue
+        for name, get, lower_is_better in metrics:
+            a, b = get(o), get(r)
+            if not a or not b:
+                continue
+            ratio = a / b if lower_is_better else b / a
+            out.append(f"{r['rows']:>9,} {name:18s} {a:14,.3f} -> {b:14,.3f}  x{ratio:.2f}")
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000,1000000", help="comma separated row counts")
+    parser.add_argument("--table", action="store_true", help="a table row per line, not virtual=True")
+    parser.add_argument("--batch-max", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sources", type=int, default=8)
+    parser.add_argument("--out", default="logger_bench.json", help="results file")
+    parser.add_argument("--compare", help="results file of an earlier run")
+    parser.add_argument("--stub", action="store_true", help="record DPG calls with dpg_backend.RecordingDPG")
+    args = parser.parse_args(argv)
+
+    global dpg
+    if args.stub and not isinstance(dpg, dpg_backend.RecordingDPG):
+        # every module imported so far that calls DPG, the Logger builds its themes in theme_klass
+        dpg = dpg_backend.install(dpg_backend.RecordingDPG(), modules=[logger_klass, theme_klass, worker_metrics])
+    recorder = dpg if isinstance(dpg, dpg_backend.RecordingDPG) else None
+
+    dpg.create_context()  # needs a context
+    dpg_version = dpg.get_dearpygui_version()
+    dpg.destroy_context()
+    Themes.clear()
+
+    gen = LogGenerator(args.seed, args.sources)
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in sorted(int(s) for s in args.rows.split(",")):
+            r = bench_rows(n, gen, tmpdir, virtual=not args.table, batch_max=args.batch_max, recorder=recorder)
+            results.append(r)
+            print(f"{n:>9,} rows: ingest {r['ingest']['lines_per_s']:,.0f} lines/s, "
+                  f"filter level {r['filter_level']['min_ms']:.2f} ms, sources {r['filter_sources']['min_ms']:.2f} ms, "
+                  f"export {r['export']['rows_per_s']:,.0f} rows/s, clear {r['clear_ms']:.2f} ms, "
+                  f"peak rss {r['peak_rss_kb'] or 0:,} kB")
+            if recorder is not None:
+                print(f"{'':>9} dpg calls per line {sum(r['ingest']['dpg_calls'].values()) / n:.2f}")
+
+    run = {"meta": {"time": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "dpg": dpg_version,
+                    "args": vars(args)},
+           "results": results}
+    with open(args.out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print(f"compared with {args.compare}, x > 1.0 is better")
+        for line in compare(old, run):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
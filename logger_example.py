@@ -1,5 +1,4 @@
 import dearpygui.dearpygui as dpg
-from threading import Timer
 from logger_klass import Logger
 
 import logging
@@ -18,9 +17,9 @@ with dpg.window(label="Logger", width=WINDOW_WIDTH, height=600):
 def _timer_cb():
     """ This timer simulates log lines being sent
     - diffent sources and log levels are used
+    - runs on the Logger thread, see Logger.call_every()
     :return:
     """
-    global _tmr
     global count
     count += 1
 
@@ -47,17 +46,13 @@ def _timer_cb():
     else:
         mylogger.log_info(count, source, msg)
 
-    if count < 100:  # stops the simulation
-        _tmr = Timer(0.2, _timer_cb)
-        _tmr.start()
-
-    else:
+    if count >= 100:  # stops the simulation
+        _tmr.cancel()
         mylogger.log("NOW", "MAIN", "This is the end of the logging", mylogger.LOG_LEVEL_INFO)
 
 
 count = 0
-_tmr = Timer(1, _timer_cb)
-_tmr.start()
+_tmr = mylogger.call_every(0.2, _timer_cb, delay=1)
 
 dpg.show_viewport()
 dpg.start_dearpygui()
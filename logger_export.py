@@ -0,0 +1,113 @@
+import io
+import csv
+import gzip
+import json
+from threading import Thread, Event
+
+
+class LogExport(Thread):
+    """ Export log rows to a file on a background thread
+    - the rows exported are the rows set in mask (a snapshot of the Logger
+      visible row mask, in LogStore slot order) in [base, end)
+    - rows are read from the store CHUNK_ROWS at a time, the lock is only held
+      while a chunk is read, so logging continues while exporting
+    - rows that are evicted from the store before they are read are skipped
+    - the export stops when it is cancelled, or when the store is cleared
+      (store.generation changed), the rows after the clear are new rows,
+      lock must be held by every writer of the store, clear() too, else the
+      generation check races the clear
+    - the format is chosen from the filename,
+        .csv    CSV, with a header row
+        .jsonl  JSON Lines, {"timestamp", "source", "level", "message"}
+        other   timestamp,source,level,message (not quoted)
+      and a trailing .gz writes it gzip compressed, ie log.csv.gz
+    - progress_cb(done, total) is called after each chunk, done_cb(error, cancelled)
+      at the end, error is None on success, cancelled is True if the export
+      stopped early and the file is incomplete, both on this thread
+
+    """
+
+    CHUNK_ROWS = 20000
+
+    FORMAT_TXT = "txt"
+    FORMAT_CSV = "csv"
+    FORMAT_JSONL = "jsonl"
+
+    def __init__(self, store, lock, mask, base, end, filename, progress_cb=None, done_cb=None):
+        super().__init__()
+        self._store = store
+        self._lock = lock
+        self._mask = mask
+        self._base = base
+        self._end = end
+        self._filename = filename
+        self._progress_cb = progress_cb
+        self._done_cb = done_cb
+        self._generation = store.generation  # the store lock is held by the caller
+        self._cancel_event = Event()
+        self.daemon = True
+        self.start()
+
+    @classmethod
+    def format_from_filename(cls, filename):
+        name = filename.lower()
+        if name.endswith(".gz"):
+            name = name[:-3]
+        if name.endswith(".csv"):
+            return cls.FORMAT_CSV
+        if name.endswith(".jsonl"):
+            return cls.FORMAT_JSONL
+        return cls.FORMAT_TXT
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _open(self):
+        if self._filename.lower().endswith(".gz"):
+            return gzip.open(self._filename, "wt", compresslevel=6, newline="")
+        return open(self._filename, "w", newline="", buffering=1024 * 1024)
+
+    def _format(self, fmt, rows):
+        if fmt == self.FORMAT_CSV:
+            buf = io.StringIO()
+            csv.writer(buf).writerows(rows)
+            return buf.getvalue()
+
+        if fmt == self.FORMAT_JSONL:
+            keys = ("timestamp", "source", "level", "message")
+            return "".join(json.dumps(dict(zip(keys, r))) + "\n" for r in rows)
+
+        return "".join(f"{r[0]},{r[1]},{r[2]},{r[3]}\n" for r in rows)
+
+    def run(self):
+        fmt = self.format_from_filename(self._filename)
+        total = self._end - self._base
+        error = None
+        cancelled = False
+        try:
+            with self._open() as f:
+                if fmt == self.FORMAT_CSV:
+                    f.write(self._format(fmt, [("timestamp", "source", "level", "message")]))
+
+                idx = self._base
+                while idx < self._end:
+                    stop = min(idx + self.CHUNK_ROWS, self._end)
+                    with self._lock:
+                        store = self._store
+                        if self._cancel_event.is_set() or store.generation != self._generation:
+                            cancelled = True
+                            break
+                        mask = self._mask
+                        rows = [store[i] for i in range(max(idx, store.base), min(stop, store.end))
+                                if mask[store.slot(i)]]
+
+                    f.write(self._format(fmt, rows))
+                    idx = stop
+                    if self._progress_cb:
+                        self._progress_cb(idx - self._base, total)
+
+        except Exception as e:
+            error = e
+
+        if self._done_cb:
+            self._done_cb(error, cancelled)
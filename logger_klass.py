@@ -1,10 +1,225 @@
 import dearpygui.dearpygui as dpg
-from threading import Lock, Thread, Event
+from threading import Lock, Thread, Event, get_ident
+from logger_store import LogStore, SpillFile
+from logger_search import SearchIndex, RegexSearch
+from logger_export import LogExport
+from logger_segment import SegmentStore
+from worker_klass import Scheduler
+from worker_metrics import WorkerMetrics
+from theme_klass import Themes
 import queue
+import asyncio
+import re
+import bisect
+import operator
+from array import array
+from itertools import compress
+from collections import deque
 import traceback
+import logging
 import time
 
 
+class LogQueue(queue.Queue):
+    """ Logger event queue, log lines are bounded, other events are not
+    - log lines are tuples and are queued with put_line(), events are dicts
+      and are queued with put() as usual, events are never dropped
+    - maxsize is the max number of queued log lines, 0 is unbounded
+    - policy, what put_line() does when maxsize lines are queued,
+        POLICY_BLOCK, wait for room, the producer is stalled, except the
+                      consumer thread (consumer_ident), it is the only one
+                      that can make room, its lines overshoot maxsize
+        POLICY_DROP_NEWEST, drop the new line
+        POLICY_DROP_OLDEST, drop the oldest queued line
+        POLICY_SAMPLE, 1 in sample_every new lines replaces the oldest
+                       queued line, the others are dropped
+    - dropped lines are counted, see take_dropped()
+    - metrics, a WorkerMetrics, records the depth and the time each item waited
+
+    """
+
+    POLICY_BLOCK = "block"
+    POLICY_DROP_NEWEST = "drop_newest"
+    POLICY_DROP_OLDEST = "drop_oldest"
+    POLICY_SAMPLE = "sample"
+
+    POLICIES = (POLICY_BLOCK, POLICY_DROP_NEWEST, POLICY_DROP_OLDEST, POLICY_SAMPLE)
+
+    def __init__(self, maxsize=0, policy=POLICY_BLOCK, sample_every=10, metrics=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"{policy} not in {self.POLICIES}")
+
+        super().__init__()  # unbounded, the line bound is applied in put_line
+        self._max_lines = maxsize
+        self._policy = policy
+        self._sample_every = max(1, sample_every)
+        self._lines = 0
+        self._sample_count = 0
+        self.dropped = 0
+        self.consumer_ident = None  # thread that get()s, set by the consumer, see POLICY_BLOCK
+        self._metrics = metrics
+        self._times = deque() if metrics is not None else None  # enqueue times, parallel to self.queue
+
+    def _put(self, item):
+        self.queue.append(item)
+        if self._times is not None:
+            self._times.append(time.perf_counter())
+            self._metrics.queued(len(self.queue))
+
+    def _get(self):
+        item = self.queue.popleft()
+        if item.__class__ is tuple:
+            self._lines -= 1
+        if self._times is not None:
+            self._metrics.dequeued(time.perf_counter() - self._times.popleft(), len(self.queue))
+        return item
+
+    def _drop_oldest_line(self):
+        # lines are nearly always at the front, events are rare
+        for i, item in enumerate(self.queue):
+            if item.__class__ is tuple:
+                del self.queue[i]
+                if self._times is not None:
+                    del self._times[i]
+                self._lines -= 1
+                return
+
+    def _overflow(self):
+        """ Apply a drop policy to a full queue, returns True if the new line is dropped """
+        self.dropped += 1
+        if self._policy == self.POLICY_DROP_NEWEST:
+            return True
+
+        if self._policy == self.POLICY_SAMPLE:
+            self._sample_count += 1
+            if self._sample_count % self._sample_every:
+                return True
+
+        self._drop_oldest_line()
+        return False
+
+    def put_line(self, line):
+        """ Queue a log line tuple, applying the overflow policy if full """
+        with self.not_full:
+            if self._max_lines and self._lines >= self._max_lines:
+                if self._policy == self.POLICY_BLOCK:
+                    if get_ident() != self.consumer_ident:
+                        while self._lines >= self._max_lines:
+                            self.not_full.wait()
+
+                elif self._overflow():
+                    return
+
+            self._put(line)
+            self._lines += 1
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def take_dropped(self):
+        """ returns the number of lines dropped since the last call """
+        with self.mutex:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class AsyncLogQueue(LogQueue):
+    """ LogQueue for an AsyncLogger, the queue belongs to the Logger's event loop
+    - put() and put_line() are thread safe and do not block, from other
+      threads the item is handed to the loop with call_soon_threadsafe
+    - await put_line_async() on any loop, waits for room with POLICY_BLOCK
+      instead of blocking the thread
+    - put_line() from another thread with POLICY_BLOCK blocks that thread
+      until there is room, like LogQueue
+    - the consumer awaits get_batch() on the loop
+
+    """
+
+    def __init__(self, loop, maxsize=0, policy=LogQueue.POLICY_BLOCK, sample_every=10, metrics=None):
+        super().__init__(maxsize, policy, sample_every, metrics)
+        self._loop = loop
+        self._has_items = asyncio.Event()
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+
+    def _on_loop(self):
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _append(self, item):
+        # on the loop
+        self._put(item)
+        if item.__class__ is tuple:
+            self._lines += 1
+            if self._max_lines and self._lines >= self._max_lines:
+                self._has_room.clear()
+        self._has_items.set()
+
+    def _put_line_nowait(self, line):
+        # on the loop, with POLICY_BLOCK a full queue is allowed to overshoot
+        if self._max_lines and self._lines >= self._max_lines and self._policy != self.POLICY_BLOCK:
+            if self._overflow():
+                return
+        self._append(line)
+
+    def put(self, item, block=True, timeout=None):
+        if self._on_loop():
+            self._append(item)
+        else:
+            self._loop.call_soon_threadsafe(self._append, item)
+
+    def put_line(self, line):
+        if self._on_loop():
+            self._put_line_nowait(line)
+
+        elif self._policy == self.POLICY_BLOCK and self._max_lines and self._lines >= self._max_lines:
+            asyncio.run_coroutine_threadsafe(self._put_line_async(line), self._loop).result()
+
+        else:
+            self._loop.call_soon_threadsafe(self._put_line_nowait, line)
+
+    async def _put_line_async(self, line):
+        # on the loop
+        if self._policy == self.POLICY_BLOCK:
+            while self._max_lines and self._lines >= self._max_lines:
+                await self._has_room.wait()
+        self._put_line_nowait(line)
+
+    async def put_line_async(self, line):
+        """ Queue a log line tuple from a coroutine, waits for room with POLICY_BLOCK """
+        if self._on_loop():
+            await self._put_line_async(line)
+        else:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._put_line_async(line), self._loop))
+
+    async def get_batch(self, max_items, timeout=None):
+        """ Wait for queued items, then take up to max_items of them
+
+        :param max_items: max items returned
+        :param timeout: max seconds to wait, None waits forever
+        :return: list of items, empty on timeout
+        """
+        if not self.queue:
+            try:
+                await asyncio.wait_for(self._has_items.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+        q = self.queue
+        items = [q.popleft() for _ in range(min(max_items, len(q)))]
+        self._lines -= sum(1 for item in items if item.__class__ is tuple)
+        if self._times is not None:
+            now = time.perf_counter()
+            for _ in items:
+                self._metrics.dequeued(now - self._times.popleft(), len(q))
+        if not q:
+            self._has_items.clear()
+        if not self._max_lines or self._lines < self._max_lines:
+            self._has_room.set()
+        return items
+
+
 class Logger(Thread):
     """
     Creates a Window to display log lines.
@@ -17,6 +232,46 @@ class Logger(Thread):
     Notes:
         1) DPG callbacks are wrapped in a lambda as a workaround for a bug
            associated with using Nuitka compiler, which I use a lot.
+        2) virtual=True creates a fixed pool of VIRTUAL_POOL_ROWS table rows
+           that are rebound to the log lines in the scroll viewport, instead of
+           creating a table row per log line.  Use this for long running logs,
+           the number of DPG items stays the same no matter how many lines.
+        3) batch_max > 1 drains up to batch_max queued events (or for batch_time
+           seconds) per loop, log lines in the batch are added to the table
+           with one lock, one container push and one scroll/width update.
+        4) max_rows bounds the number of log lines kept, the oldest lines are
+           evicted.  With spill_filename set, evicted lines are written to a
+           rotating file (spill_max_bytes, spill_backup_count) so nothing is lost.
+        5) Search box, matches rows containing all the words of the search text
+           using an inverted index (search_index=True), or with "Re" checked a
+           regex scan on a background thread.  "<" and ">" navigate the matches,
+           "Matches" filters the display to the matching rows.
+        6) Export runs on a LogExport thread, logging continues while exporting.
+           The format follows export_filename, .csv, .jsonl or text, add .gz
+           to compress, ie "log.csv.gz".
+        7) Log lines are queued as tuples, (timestamp, source, level, message, args),
+           message % args is done on the Logger thread.  LoggerHandler attaches
+           a Logger to the python logging tree.
+        8) queue_max bounds the number of queued log lines, queue_policy is
+           what happens when it is full, see LogQueue.  Dropped lines are
+           reported with a "N lines dropped" row.
+        9) history_path, every log line is also appended to a SegmentStore in
+           that directory.  With virtual=True the lines already in the store
+           when the Logger is created are shown before the new lines, they are
+           read from the memory mapped store as they are scrolled into view.
+           History lines are not searched or exported, clear() hides them.
+        10) shm_ring, a ShmLogRing that log producers in other processes write
+            into (see ShmLogProducer), drained with the queue, and polled every
+            shm_poll seconds when the queue is idle.
+        11) AsyncLogger runs the Logger thread as an asyncio event loop, for
+            coroutine log producers, see AsyncLogger.
+        12) call_later() and call_every() run functions on the Logger thread,
+            ie simulated or polled log sources, without Timer threads.
+        13) metrics=True, self.metrics is a WorkerMetrics, queue wait times,
+            queue depth and handler times, log line batches are timed as
+            WorkerMetrics.LOG, see worker_metrics.metrics_window().
+        14) The log level themes come from theme_klass.Themes, they are shared
+            by all the Loggers and follow Themes.use_palette(), ie dark/light.
 
     """
 
@@ -27,6 +282,9 @@ class Logger(Thread):
     LOG_LEVEL_ERROR = 4
     LOG_LEVEL_CRITICAL = 5
     LOG_LEVEL_COMBO_DEFAULT = "INFO"
+    LOG_LEVEL_PALETTE = {LOG_LEVEL_TRACE: "log_trace", LOG_LEVEL_DEBUG: "log_debug", LOG_LEVEL_INFO: "log_info",
+                         LOG_LEVEL_WARN: "log_warn", LOG_LEVEL_ERROR: "log_error",
+                         LOG_LEVEL_CRITICAL: "log_critical"}  # level -> Themes palette key
 
     ROW_IDX_TIMESTAMP = 0
     ROW_IDX_SOURCE = 1
@@ -41,11 +299,20 @@ class Logger(Thread):
     TABLE_FIXED_WIDTH = TABLE_COL_TIMESTAMP_WIDTH + TABLE_COL_SOURCE_WIDTH + TABLE_COL_LOGLEVEL_WIDTH
 
     TABLE_FONT_HEIGHT = 8
+    TABLE_ROW_HEIGHT = 17  # pixels, default font 13 + cell padding 2 * 2
+
+    VIRTUAL_POOL_ROWS = 100  # number of recycled rows, must cover the window height
 
     EVENT_SHUTDOWN = "EVENT_SHUTDOWN"
     EVENT_LOG = "EVENT_LOG"
     EVENT_EXPORT = "EVENT_EXPORT"
+    EVENT_EXPORT_DONE = "EVENT_EXPORT_DONE"
     EVENT_CLEAR = "EVENT_CLEAR"
+    EVENT_SEARCH = "EVENT_SEARCH"
+    EVENT_SEARCH_DONE = "EVENT_SEARCH_DONE"
+    EVENT_SEARCH_NAV = "EVENT_SEARCH_NAV"
+    EVENT_HISTORY = "EVENT_HISTORY"
+    EVENT_WAKE = "EVENT_WAKE"
 
     # colors found by trial and error from: https://rgbacolorpicker.com/
     SOURCE_ROW_COLORBG = [
@@ -54,7 +321,12 @@ class Logger(Thread):
         (136, 248, 167, 80), (79, 150, 146, 80), (5, 172, 52, 80), (175, 31, 31, 80)
     ]
 
-    def __init__(self, label="Logger", tag_root="logger", export_filename="log.txt", loggerIn=None):
+    def __init__(self, label="Logger", tag_root="logger", export_filename="log.txt", loggerIn=None,
+                 virtual=False, batch_max=1, batch_time=0.02,
+                 max_rows=None, spill_filename=None, spill_max_bytes=10 * 1024 * 1024, spill_backup_count=5,
+                 search_index=True, queue_max=0, queue_policy=LogQueue.POLICY_BLOCK,
+                 history_path=None, history_segment_bytes=64 * 1024 * 1024,
+                 shm_ring=None, shm_poll=0.01, metrics=False):
         super(Logger, self).__init__()
 
         class StubLogger(object):
@@ -69,38 +341,73 @@ class Logger(Thread):
         else: self.logger = StubLogger()
 
         self._tag_root = tag_root
-        self._tags = []
+        self._tags = {}  # item -> tag, insertion ordered, rows are keyed by their absolute index
         self._export_filename = export_filename
         self._table_width = 0  # tracks and creates horizontal scrollbar
         self._scrolling = True
-        self._table_rows = 0
         self._log_level = self.LOG_LEVEL_INFO
         self._lock = Lock()
-        self._q = queue.Queue()
+        self.metrics = WorkerMetrics() if metrics else None
+        self._q = self._create_queue(queue_max, queue_policy)
         self._stop_event = Event()
         self._sources = {}  # keys are from SOURCE
                             # {"show": True, "theme": <obj>}
 
-        self._rows = []
+        self._rows = LogStore(max_rows)  # columnar, rows are addressed by absolute index, see LogStore
+        self._spill = None
+        if spill_filename:
+            self._spill = SpillFile(spill_filename, spill_max_bytes, spill_backup_count)
+
+        self._virtual = virtual
+        self._shown = bytearray()  # 1 for rows that pass the level/source filters, by LogStore slot
+        self._visible = array("q")  # virtual: sorted indexes into self._rows that pass the filters,
+                                    # history rows are -1 (newest) .. -self._history_len
+        self._pool = []     # virtual: [row, [sel, sel, sel, sel]] for each recycled row
+        self._pool_bound = [None] * self.VIRTUAL_POOL_ROWS  # virtual: row index bound to each pool row
+        self._view_first = -1
+        self._view_dirty = True
+
+        self._search_index = SearchIndex() if search_index else None
+        self._search = None           # active search, ("words", tokens) or ("regex", pattern)
+        self._search_matches = []     # sorted row indexes matching the active search
+        self._search_pos = -1         # index into self._search_matches of the current match
+        self._search_scan = None      # RegexSearch thread while scanning
+        self._search_filter = False   # only show matching rows
+        self._search_selected = None  # table display: row index with the selected match
+
+        self._history = None
+        self._history_len = 0  # number of history rows shown
+        if history_path:
+            self._history = SegmentStore(history_path, history_segment_bytes)
+
+        self._shm_ring = shm_ring
+        self._shm_poll = shm_poll if shm_ring is not None else None  # queue get timeout
+        self._shm_dropped = 0
+
+        self._sched = Scheduler(lambda: self.__q({"type": self.EVENT_WAKE}))
+
+        self._export = None     # LogExport thread while exporting
+        self._export_ui = None  # (text, progress_bar) of the export modal
+
+        self._batch_max = max(1, batch_max)  # max events drained from the queue per batch
+        self._batch_time = batch_time       # max seconds spent draining a batch
 
         self.name = tag_root
         self.start()
 
         self.LOG_LEVEL_MAP = {
-            self.LOG_LEVEL_TRACE:    {"str": "TRACE", "color": (0, 255, 0, 255)},
-            self.LOG_LEVEL_DEBUG:    {"str": "DEBUG", "color": (64, 128, 255, 255)},
-            self.LOG_LEVEL_INFO:     {"str": "INFO",  "color": (255, 255, 255, 255)},
-            self.LOG_LEVEL_WARN:     {"str": "WARN",  "color": (255, 255, 0, 255)},
-            self.LOG_LEVEL_ERROR:    {"str": "ERROR", "color": (255, 0, 0, 255)},
-            self.LOG_LEVEL_CRITICAL: {"str": "CRTCL", "color": (255, 0, 0, 255)},
+            self.LOG_LEVEL_TRACE:    {"str": "TRACE"},
+            self.LOG_LEVEL_DEBUG:    {"str": "DEBUG"},
+            self.LOG_LEVEL_INFO:     {"str": "INFO"},
+            self.LOG_LEVEL_WARN:     {"str": "WARN"},
+            self.LOG_LEVEL_ERROR:    {"str": "ERROR"},
+            self.LOG_LEVEL_CRITICAL: {"str": "CRTCL"},
         }
 
+        # the level themes are shared by all the Loggers, the colors are LOG_LEVEL_PALETTE
+        # keys, see Themes.PALETTES, the theme follows Themes.use_palette()
         for k, v in self.LOG_LEVEL_MAP.items():
-            with dpg.theme() as theme:
-                with dpg.theme_component(0):
-                    dpg.add_theme_color(dpg.mvThemeCol_Text, v["color"])
-
-            self.LOG_LEVEL_MAP[k]["theme"] = theme
+            v["theme"] = Themes.get(((0, ((Themes.COLOR, dpg.mvThemeCol_Text, self.LOG_LEVEL_PALETTE[k]),)),))
 
         with dpg.group(horizontal=True):
 
@@ -131,6 +438,32 @@ class Logger(Thread):
                           tag=self.__tag("combo_sources"),
                           callback=lambda s, u, a: self._cb_combo_sources(s, u, a))
 
+            dpg.add_input_text(hint="Search",
+                               width=120,
+                               on_enter=True,
+                               tag=self.__tag("input_search"),
+                               callback=lambda s, u, a: self._cb_input_search(s, u, a))
+
+            dpg.add_checkbox(label="Re",
+                             tag=self.__tag("checkbox_regex"),
+                             callback=lambda s, u, a: self._cb_input_search(s, u, a))
+
+            dpg.add_button(label="<",
+                           tag=self.__tag("button_search_prev"),
+                           callback=lambda s, u, a: self._cb_button_search_nav(s, u, a),
+                           user_data=-1)
+
+            dpg.add_button(label=">",
+                           tag=self.__tag("button_search_next"),
+                           callback=lambda s, u, a: self._cb_button_search_nav(s, u, a),
+                           user_data=1)
+
+            dpg.add_checkbox(label="Matches",
+                             tag=self.__tag("checkbox_search_filter"),
+                             callback=lambda s, u, a: self._cb_checkbox_search_filter(s, u, a))
+
+            dpg.add_text("", tag=self.__tag("text_search"))
+
         with dpg.child_window(label=label,
                               tag=self.__tag("child_window"),
                               horizontal_scrollbar=True,
@@ -139,6 +472,9 @@ class Logger(Thread):
                               tracked=True,
                               track_offset=-1.0):
 
+            if self._virtual:
+                dpg.add_spacer(height=0, show=False, tag=self.__tag("spacer_top"))
+
             with dpg.table(header_row=False,
                            tag=self.__tag("table")):
 
@@ -154,19 +490,45 @@ class Logger(Thread):
                 dpg.add_table_column(width=self.TABLE_COL_MSG_WIDTH * self.TABLE_FONT_WIDTH,
                                      tag=self.__tag("col_msg"))  # message string
 
+                if self._virtual:
+                    self._create_pool_rows()
+
+            if self._virtual:
+                dpg.add_spacer(height=0, show=False, tag=self.__tag("spacer_bottom"))
+
+        if self._virtual:
+            # table visible handler runs every frame, used to track the scroll viewport
+            with dpg.item_handler_registry(tag=self.__tag("table_handlers")):
+                dpg.add_item_visible_handler(callback=lambda s, u, a: self._cb_table_visible(s, u, a))
+            dpg.bind_item_handler_registry(self.__tag("table"), self.__tag("table_handlers"))
+
+            if self._history is not None and self._history.history_len():
+                self.__q({"type": self.EVENT_HISTORY})
+
     def __q(self, item_dict: dict):
         self.logger.debug(item_dict)
         self._q.put(item_dict)
 
     def __tag(self, item):
         """
-        create a tag, append to list of known, and return it
+        create a tag, add to the known tags, and return it
+        - the tag is only formatted the first time item is seen
         :param item:
         :return:
         """
-        tag = f"""{self._tag_root}_{item}"""
-        if tag not in self._tags:
-            self._tags.append(tag)
+        tag = self._tags.get(item)
+        if tag is None:
+            tag = self._tags[item] = f"""{self._tag_root}_{item}"""
+        return tag
+
+    def __row_tag(self, idx):
+        """
+        create the tag for the table row of absolute row index idx
+        - lookups after creation are self._tags[idx]
+        :param idx:
+        :return:
+        """
+        tag = self._tags[idx] = f"""{self._tag_root}_row_{idx}"""
         return tag
 
     def _create_listbox_sources_items(self):
@@ -188,32 +550,199 @@ class Logger(Thread):
 
         return self._sources[source]["show"]
 
+    def _create_pool_rows(self):
+        """ Create the fixed pool of rows used by the virtual display
+        - rows start hidden, and are bound to log lines by _refresh_viewport
+        """
+        for i in range(self.VIRTUAL_POOL_ROWS):
+            with dpg.table_row(show=False, tag=self.__tag(f"pool_{i}")) as row:
+                sels = []
+                for col in (self.ROW_IDX_TIMESTAMP, self.ROW_IDX_SOURCE, self.ROW_IDX_LOGLEVEL, self.ROW_IDX_MSG):
+                    sel = dpg.add_selectable(label="",
+                                             span_columns=True,
+                                             callback=lambda s, u, a: self._cb_table_row(s, u, a),
+                                             user_data=(col, None))
+                    sels.append(sel)
+
+            self._pool.append([row, sels])
+
+    def _cb_table_visible(self, sender, app_data, user_data):
+        # called every frame on the DPG thread, keep it cheap when nothing changed
+        self._refresh_viewport()
+
+    def _refresh_viewport(self):
+        """ Rebind the pool rows to the slice of log lines in the scroll viewport
+        - only pool rows that are bound to a different log line are touched
+        """
+        with self._lock:
+            first = int(dpg.get_y_scroll(self.__tag("child_window")) // self.TABLE_ROW_HEIGHT)
+            num_visible = len(self._visible)
+            first = max(0, min(first, num_visible - self.VIRTUAL_POOL_ROWS))
+            if first == self._view_first and not self._view_dirty:
+                return
+
+            self._view_first = first
+            self._view_dirty = False
+
+            top = first * self.TABLE_ROW_HEIGHT
+            bottom = max(0, num_visible - first - self.VIRTUAL_POOL_ROWS) * self.TABLE_ROW_HEIGHT
+            dpg.configure_item(self.__tag("spacer_top"), height=top, show=top > 0)
+            dpg.configure_item(self.__tag("spacer_bottom"), height=bottom, show=bottom > 0)
+
+            for i in range(self.VIRTUAL_POOL_ROWS):
+                idx = first + i
+                row_idx = self._visible[idx] if idx < num_visible else None
+                if row_idx == self._pool_bound[i]:
+                    continue
+
+                self._pool_bound[i] = row_idx
+                row, sels = self._pool[i]
+                if row_idx is None:
+                    dpg.configure_item(row, show=False)
+                    continue
+
+                r = self._row(row_idx)
+                log_level = r[self.ROW_IDX_LOGLEVEL]
+                theme = self.LOG_LEVEL_MAP[log_level]["theme"]
+                lvl = self.LOG_LEVEL_MAP[log_level]["str"]
+                labels = (r[self.ROW_IDX_TIMESTAMP], r[self.ROW_IDX_SOURCE], f"[{lvl:5s}]", r[self.ROW_IDX_MSG])
+                # a selection the user clicked belongs to the old line, only the
+                # current search match is selected, on its message
+                selected = (False, False, False, row_idx == self._search_current())
+                for col, (sel, label) in enumerate(zip(sels, labels)):
+                    dpg.configure_item(sel, label=label, user_data=(col, row_idx))
+                    dpg.bind_item_theme(sel, theme)
+                    dpg.set_value(sel, selected[col])
+
+                dpg.highlight_table_row(self.__tag("table"), i, self._sources[r[self.ROW_IDX_SOURCE]]["color"])
+                dpg.configure_item(row, show=True)
+
+    def _row(self, idx):
+        """ row idx as [timestamp, source, log_level, msg], negative idx are history rows """
+        if idx < 0:
+            return self._history.row(self._history.history_len() + idx)
+        return self._rows[idx]
+
+    def _event_history(self, item):
+        """ Show the history rows, the sources are added to the sources combo """
+        for source in self._history.source_names:
+            self._show_source(source)
+
+        self._history_len = self._history.history_len()
+        self._apply_filters()
+        if self._scrolling:
+            dpg.set_y_scroll(self.__tag("child_window"), -1.0)
+
+    def _invalidate_viewport(self):
+        """ Force the virtual display to rebind all the pool rows on the next frame """
+        self._pool_bound = [None] * self.VIRTUAL_POOL_ROWS
+        self._view_dirty = True
+
     def _add_table_row(self, timestamp, source, log_level, msg):
-        if not isinstance(timestamp, str):
-            timestamp = str(timestamp)
+        self._add_table_rows([(timestamp, source, log_level, msg)])
+
+    def _add_table_rows(self, lines):
+        """ Add a batch of log lines
+        - the table container push, scroll and table width update are done once per batch
+
+        :param lines: list of (timestamp, source, log_level, msg)
+        :return: None
+        """
+        widest = None
+        evicted = 0
+        spilled = []
 
-        r = [timestamp, source, log_level, msg]
-        self._rows.append(r)
+        if self._history is not None:
+            self._history.append(lines)
 
-        show_row = self._show_source(source)
-        if log_level < self._log_level:
-            show_row = False
+        if not self._virtual:
+            dpg.push_container_stack(self.__tag("table"))
 
-        def _set_table_width(row_items):
-            # causes horizontal scroll bar to appear if necessary
-            w1 = (self.TABLE_FIXED_WIDTH + len(row_items[self.ROW_IDX_MSG])) * self.TABLE_FONT_WIDTH
-            w2 = (self.TABLE_FIXED_WIDTH + self.TABLE_COL_MSG_WIDTH) * self.TABLE_FONT_WIDTH
-            w = max(w1, w2)
-            if w > self._table_width:
-                self._table_width = w
-                dpg.configure_item(self.__tag("table"), width=w)
+        for timestamp, source, log_level, msg in lines:
+            idx = self._rows.end
+            if self._spill and self._rows.is_full():
+                spilled.append(self._row_line(self._rows[self._rows.base]))
 
+            if self._rows.append(timestamp, source, log_level, msg):
+                evicted += 1
+                if not self._virtual:
+                    self._delete_table_row(self._rows.base - 1)
+
+            if not isinstance(timestamp, str):
+                timestamp = str(timestamp)
+
+            r = [timestamp, source, log_level, msg]
+
+            show_row = self._show_source(source)
+            if log_level < self._log_level:
+                show_row = False
+
+            if self._search_index is not None:
+                self._search_index.add(idx, msg)
+
+            if self._search is not None:
+                if self._search_match(msg):
+                    self._search_matches.append(idx)
+                elif self._search_filter:
+                    show_row = False
+
+            slot = self._rows.slot(idx)
+            if slot < len(self._shown):
+                self._shown[slot] = show_row
+            else:
+                self._shown.append(show_row)
+
+            if self._virtual:
+                if show_row:
+                    self._visible.append(idx)
+                    self._view_dirty = True
+
+            else:
+                self._create_table_row(r, idx, show_row)
+
+            if widest is None or len(msg) > len(widest[self.ROW_IDX_MSG]):
+                widest = r
+
+        if not self._virtual:
+            dpg.pop_container_stack()
+
+        if evicted:
+            if self._virtual:
+                # visible is sorted, evicted rows are always at the front
+                del self._visible[bisect.bisect_left(self._visible, 0):bisect.bisect_left(self._visible, self._rows.base)]
+                self._view_dirty = True
+
+            if self._search_index is not None:
+                self._search_index.evict(self._rows.base)
+
+            if self._search_matches:
+                n = bisect.bisect_left(self._search_matches, self._rows.base)
+                del self._search_matches[:n]
+                self._search_pos = max(-1, self._search_pos - n)
+
+        if spilled:
+            self._spill.write(spilled)
+
+        if self._scrolling:
+            dpg.set_y_scroll(self.__tag("child_window"), -1.0)  # needed to keep scroll at bottom
+
+        if widest is not None:
+            self._set_table_width(widest)
+
+    def _create_table_row(self, r, idx, show_row):
+        """ Create the DPG table row for a log line, the table must be on the container stack
+
+        :param r: row data
+        :param idx: absolute row index in self._rows
+        :param show_row: [True|False]
+        :return: None
+        """
+        timestamp, source, log_level, msg = r
         theme = self.LOG_LEVEL_MAP[log_level]["theme"]
 
-        dpg.push_container_stack(self.__tag("table"))
         with dpg.table_row(user_data=(log_level, source),
                            show=show_row,
-                           tag=self.__tag(f"row_{self._table_rows}")):
+                           tag=self.__row_tag(idx)):
 
             # NOTE: tried to set the column widths on selectable, but it breaks the
             #       span all coulmns when mouse is selecting... choice between correct
@@ -223,37 +752,47 @@ class Logger(Thread):
             sel = dpg.add_selectable(label=timestamp,
                                      span_columns=True,
                                      callback=lambda s, u, a: self._cb_table_row(s, u, a),
-                                     user_data=(self.ROW_IDX_TIMESTAMP, self._table_rows))
+                                     user_data=(self.ROW_IDX_TIMESTAMP, idx))
             dpg.bind_item_theme(sel, theme)
 
             sel = dpg.add_selectable(label=source,
                                      span_columns=True,
                                      callback=lambda s, u, a: self._cb_table_row(s, u, a),
-                                     user_data=(self.ROW_IDX_SOURCE, self._table_rows))
+                                     user_data=(self.ROW_IDX_SOURCE, idx))
             dpg.bind_item_theme(sel, theme)
 
             lvl = self.LOG_LEVEL_MAP[log_level]["str"]
             sel = dpg.add_selectable(label=f"[{lvl:5s}]",
                                      span_columns=True,
                                      callback=lambda s, u, a: self._cb_table_row(s, u, a),
-                                     user_data=(self.ROW_IDX_LOGLEVEL, self._table_rows))
+                                     user_data=(self.ROW_IDX_LOGLEVEL, idx))
             dpg.bind_item_theme(sel, theme)
 
             sel = dpg.add_selectable(label=msg,
                                      span_columns=True,
                                      callback=lambda s, u, a: self._cb_table_row(s, u, a),
-                                     user_data=(self.ROW_IDX_MSG, self._table_rows))
+                                     user_data=(self.ROW_IDX_MSG, idx))
             dpg.bind_item_theme(sel, theme)
 
-        dpg.highlight_table_row(self.__tag("table"), self._table_rows, self._sources[source]["color"])
+        # table position, evicted rows have already been deleted from the table
+        dpg.highlight_table_row(self.__tag("table"), len(self._rows) - 1, self._sources[source]["color"])
 
-        self._table_rows += 1
+    def _delete_table_row(self, idx):
+        tag = self._tags.pop(idx, None)
+        if tag is not None:  # None if creating the table row failed
+            dpg.delete_item(tag)
 
-        dpg.pop_container_stack()
-        if self._scrolling:
-            dpg.set_y_scroll(self.__tag("child_window"), -1.0)  # needed to keep scroll at bottom
+    def _row_line(self, r):
+        return f"{r[self.ROW_IDX_TIMESTAMP]},{r[self.ROW_IDX_SOURCE]},{r[self.ROW_IDX_LOGLEVEL]},{r[self.ROW_IDX_MSG]}"
 
-        _set_table_width(r)
+    def _set_table_width(self, row_items):
+        # causes horizontal scroll bar to appear if necessary
+        w1 = (self.TABLE_FIXED_WIDTH + len(row_items[self.ROW_IDX_MSG])) * self.TABLE_FONT_WIDTH
+        w2 = (self.TABLE_FIXED_WIDTH + self.TABLE_COL_MSG_WIDTH) * self.TABLE_FONT_WIDTH
+        w = max(w1, w2)
+        if w > self._table_width:
+            self._table_width = w
+            dpg.configure_item(self.__tag("table"), width=w)
 
     def _cb_table_row(self, sender, app_data, user_data):
         self.logger.info(f"{sender} {app_data} {user_data}")
@@ -289,12 +828,30 @@ class Logger(Thread):
             dpg.configure_item(self.__tag("combo_sources"), items=listbox_sources)
             dpg.set_value(self.__tag("combo_sources"), "Sources")
 
-        for i in range(self._table_rows):
-            tag = self.__tag(f"row_{i}")
-            dpg.delete_item(tag)
-
-        self._table_rows = 0
-        self._rows = []
+        if not self._virtual:
+            for i in range(self._rows.base, self._rows.end):
+                self._delete_table_row(i)
+
+        self._rows.clear()
+        self._shown = bytearray()
+        if self._search_index is not None:
+            self._search_index.clear()
+        self._search_matches = []
+        self._search_pos = -1
+        self._search_selected = None
+        if self._search_scan is not None:
+            self._search_scan.cancel()
+            self._search_scan = None
+            self._search = None
+        self._set_search_status()
+
+        if self._export is not None:
+            self._export.cancel()
+
+        if self._virtual:
+            self._visible = array("q")
+            self._history_len = 0
+            self._invalidate_viewport()
 
     def _event_clear(self, item):
         self._clear_logger(clear_sources=True)
@@ -310,40 +867,201 @@ class Logger(Thread):
         self.__q(item_dict)
 
     def _event_export(self, item):
-        try:
-            with open(self._export_filename, "w") as f:
-                for i in range(self._table_rows):
-                    row_tag = self.__tag(f"row_{i}")
-                    r = self._rows[i]
-                    if self._is_row_showing(row_tag):
-                        line = f"{r[self.ROW_IDX_TIMESTAMP]},{r[self.ROW_IDX_SOURCE]},{r[self.ROW_IDX_LOGLEVEL]},{r[self.ROW_IDX_MSG]}"
-                        print(line, file=f)
-
-        except Exception as e:
-            self.logger.error(e)
+        """ Start exporting the visible rows on a LogExport thread
+        - the visible row mask is copied, rows that are added after this are not exported
+        """
+        if self._export is not None:
+            self.logger.error(f"export to {self._export_filename} already running")
             return
 
-        with dpg.window(label="Log Exported",
+        with dpg.window(label="Log Export",
                         width=200,
-                        height=50,
+                        height=70,
                         modal=True,
                         pos=(100, 100),
                         no_collapse=True,
                         no_move=True,
                         no_resize=True):
 
-            dpg.add_text(default_value=self._export_filename)
+            text = dpg.add_text(default_value=f"Exporting {self._export_filename}")
+            progress = dpg.add_progress_bar(default_value=0.0, width=-1)
+
+        self._export_ui = (text, progress)
+
+        def _progress(done, total):
+            dpg.set_value(progress, done / total)
 
-    def _is_row_showing(self, row_tag):
-        row_level, row_source = dpg.get_item_user_data(row_tag)
-        source_show = self._sources[row_source]["show"]
-        return row_level >= self._log_level and source_show
+        def _done(error, cancelled):
+            self.__q({"type": self.EVENT_EXPORT_DONE, "error": error, "cancelled": cancelled})
+
+        self._export = LogExport(self._rows, self._lock, bytes(self._shown), self._rows.base, self._rows.end,
+                                 self._export_filename, _progress, _done)
+
+    def _event_export_done(self, item):
+        self._export = None
+        text, progress = self._export_ui
+        if item["error"] is not None:
+            self.logger.error(item["error"])
+            dpg.set_value(text, f"Export failed: {item['error']}")
+            return
+
+        if item["cancelled"]:
+            dpg.set_value(text, f"Export cancelled, {self._export_filename} is incomplete")
+            return
+
+        dpg.set_value(text, self._export_filename)
+        dpg.set_value(progress, 1.0)
 
     def __update_show_rows(self):
         with self._lock:
-            for i in range(self._table_rows):
-                row_tag = self.__tag(f"row_{i}")
-                dpg.configure_item(row_tag, show=self._is_row_showing(row_tag))
+            self._apply_filters()
+
+    def _apply_filters(self):
+        """ Apply the level/source (and search match) filters, self._lock must be held
+        - the visible row mask is computed in one pass over the level and source columns
+        - virtual display rebuilds the visible list and redraws the viewport,
+          otherwise only the table rows whose visibility changed are configured
+        """
+        source_show = [self._sources[name]["show"] for name in self._rows.source_names]
+        shown = self._rows.mask(self._log_level, source_show)
+
+        if self._search_filter and self._search is not None:
+            matched = bytearray(len(shown))
+            for i in self._search_matches:
+                matched[self._rows.slot(i)] = 1
+            shown = bytes(map(operator.and_, shown, matched))
+
+        if self._virtual:
+            self._visible = array("q", self._rows.indexes(shown))
+            if self._history_len and not (self._search_filter and self._search is not None):
+                source_show = [self._sources.get(name, {"show": True})["show"] for name in self._history.source_names]
+                history_shown = self._history.mask(self._log_level, source_show)
+                self._visible = array("q", compress(range(-self._history_len, 0), history_shown)) + self._visible
+            self._invalidate_viewport()
+
+        else:
+            for slot in compress(range(len(shown)), map(operator.ne, self._shown, shown)):
+                dpg.configure_item(self._tags[self._rows.index(slot)], show=bool(shown[slot]))
+
+        self._shown = bytearray(shown)
+
+    def _cb_input_search(self, sender, app_data, user_data):
+        self.logger.info(f"{sender} {app_data} {user_data}")
+        item_dict = {"type": self.EVENT_SEARCH,
+                     "text": dpg.get_value(self.__tag("input_search")),
+                     "regex": dpg.get_value(self.__tag("checkbox_regex"))}
+        self.__q(item_dict)
+
+    def _cb_button_search_nav(self, sender, app_data, user_data):
+        self.logger.info(f"{sender} {app_data} {user_data}")
+        item_dict = {"type": self.EVENT_SEARCH_NAV, "step": user_data}
+        self.__q(item_dict)
+
+    def _cb_checkbox_search_filter(self, sender, app_data, user_data):
+        self.logger.info(f"{sender} {app_data} {user_data}")
+        self._search_filter = app_data
+        self.__update_show_rows()
+
+    def _search_match(self, msg):
+        kind, what = self._search
+        if kind == "regex":
+            return what.search(msg) is not None
+        return what <= self._search_index.tokens(msg)
+
+    def _search_current(self):
+        if 0 <= self._search_pos < len(self._search_matches):
+            return self._search_matches[self._search_pos]
+        return None
+
+    def _set_search_status(self):
+        if self._search is None:
+            status = ""
+        elif self._search_scan is not None:
+            status = "searching..."
+        else:
+            status = f"{self._search_pos + 1}/{len(self._search_matches)}"
+        dpg.set_value(self.__tag("text_search"), status)
+
+    def _event_search(self, item):
+        """ Start a new search
+        - words are looked up in the inverted index, the result is immediate
+        - regex, or words without an index, are scanned on a RegexSearch thread,
+          rows added while scanning are matched as they arrive
+        """
+        if self._search_scan is not None:
+            self._search_scan.cancel()
+            self._search_scan = None
+
+        self._search = None
+        self._search_matches = []
+        self._search_pos = -1
+
+        text = item["text"].strip()
+        if text:
+            if item["regex"]:
+                try:
+                    self._search = ("regex", re.compile(text, re.IGNORECASE))
+                except re.error as e:
+                    self.logger.error(f"search regex {text}: {e}")
+                    dpg.set_value(self.__tag("text_search"), "bad regex")
+                    return
+
+            elif self._search_index is not None:
+                self._search = ("words", self._search_index.tokens(text))
+                self._search_matches = self._search_index.query(text, self._rows.base)
+
+            else:
+                # no index, scan for a line with all the words
+                words = set(SearchIndex.TOKEN_RE.findall(text.lower()))
+                pattern = "^" + "".join(rf"(?=.*\b{re.escape(w)}\b)" for w in words)
+                self._search = ("regex", re.compile(pattern, re.IGNORECASE))
+
+            if self._search[0] == "regex":
+                search = self._search
+
+                def _done(matches, end):
+                    self.__q({"type": self.EVENT_SEARCH_DONE, "search": search, "matches": matches, "end": end})
+
+                self._search_scan = RegexSearch(self._rows, self._lock, self._search[1], _done)
+
+        if self._search_filter:
+            self._apply_filters()
+        self._set_search_status()
+
+    def _event_search_done(self, item):
+        if item["search"] is not self._search:
+            return  # stale, superseded by a newer search
+
+        # rows added while scanning were matched in _add_table_rows
+        self._search_scan = None
+        base = self._rows.base
+        self._search_matches = [i for i in item["matches"] if i >= base] + self._search_matches
+        if self._search_filter:
+            self._apply_filters()
+        self._set_search_status()
+
+    def _event_search_nav(self, item):
+        """ Scroll to the next/previous match, the match is shown at the top of the window """
+        if not self._search_matches:
+            return
+
+        self._search_pos = (self._search_pos + item["step"]) % len(self._search_matches)
+        idx = self._search_matches[self._search_pos]
+        self._scrolling = False
+
+        if self._virtual:
+            pos = bisect.bisect_left(self._visible, idx)
+            self._invalidate_viewport()
+
+        else:
+            pos = bisect.bisect_left(self._rows.indexes(self._shown), idx)
+            if self._search_selected is not None and self._search_selected in self._tags:
+                dpg.set_value(dpg.get_item_children(self._tags[self._search_selected], 1)[self.ROW_IDX_MSG], False)
+            dpg.set_value(dpg.get_item_children(self._tags[idx], 1)[self.ROW_IDX_MSG], True)
+            self._search_selected = idx
+
+        dpg.set_y_scroll(self.__tag("child_window"), pos * self.TABLE_ROW_HEIGHT)
+        self._set_search_status()
 
     def _cb_combo_level(self, sender, app_data, user_data):
         self.logger.info(f"{sender} {app_data} {user_data}")
@@ -362,7 +1080,7 @@ class Logger(Thread):
         Get all the tags created in this logger
         :return:
         """
-        return self._tags
+        return list(self._tags.values())
 
     def set_log_level(self, level=LOG_LEVEL_INFO):
         self._log_level = level
@@ -374,7 +1092,10 @@ class Logger(Thread):
         :param clear_sources: [True|False], when set clears all known sources
         :return: None
         """
-        self._clear_logger(clear_sources)
+        # under the lock, the Logger thread appends to the store and reads
+        # the rows, and an export checks the store generation, under it
+        with self._lock:
+            self._clear_logger(clear_sources)
 
     def _event_log(self, item):
         self._add_table_row(item["timestamp"],
@@ -382,21 +1103,50 @@ class Logger(Thread):
                             item["level"],
                             item["message"])
 
+    def _log_batch(self, lines):
+        """ Flush log lines to the table, an error only costs this flush """
+        try:
+            if self.metrics is None:
+                self._event_log_batch(lines)
+                return
+
+            t0 = time.perf_counter()
+            self._event_log_batch(lines)
+            self.metrics.handled_event(WorkerMetrics.LOG, time.perf_counter() - t0, len(lines))
+
+        except Exception as e:
+            self.logger.error(f"Error adding {len(lines)} log lines, {e}")
+            traceback.print_exc()
+
+    def _event_log_batch(self, lines):
+        """ Add queued log lines
+        :param lines: list of (timestamp, source, level, message, args), message % args is done here
+        """
+        self._add_table_rows([(timestamp, source, level, self._format_message(message, args) if args else str(message))
+                              for timestamp, source, level, message, args in lines])
+
+    @staticmethod
+    def _format_message(message, args):
+        """ message % args, a line that does not format, ie too few args, is
+        kept as message followed by args, like logging.Handler.handleError,
+        the other lines of the batch are not lost
+        """
+        try:
+            return str(message) % args
+        except Exception:
+            return f"{message} {args!r}"
+
+    def _enqueue_line(self, line):
+        """ Queue a log line, (timestamp, source, level, message, args)
+        - no dict and no debug logging per line, lines are the hot path
+        """
+        self._q.put_line(line)
+
     def log_trace(self, timestamp, source, message):
-        item_dict = {"type": self.EVENT_LOG,
-                     "timestamp": timestamp,
-                     "level": self.LOG_LEVEL_TRACE,
-                     "source": source,
-                     "message": message}
-        self.__q(item_dict)
+        self._enqueue_line((timestamp, source, self.LOG_LEVEL_TRACE, message, None))
 
     def log_debug(self, timestamp, source, message):
-        item_dict = {"type": self.EVENT_LOG,
-                     "timestamp": timestamp,
-                     "level": self.LOG_LEVEL_DEBUG,
-                     "source": source,
-                     "message": message}
-        self.__q(item_dict)
+        self._enqueue_line((timestamp, source, self.LOG_LEVEL_DEBUG, message, None))
 
     def log_info(self, timestamp, source, message):
         """ Log at Info level
@@ -406,85 +1156,297 @@ class Logger(Thread):
         :param message: string
         :return: None
         """
-        item_dict = {"type": self.EVENT_LOG,
-                     "timestamp": timestamp,
-                     "level": self.LOG_LEVEL_INFO,
-                     "source": source,
-                     "message": message}
-        self.__q(item_dict)
+        self._enqueue_line((timestamp, source, self.LOG_LEVEL_INFO, message, None))
 
     def log_warn(self, timestamp, source, message):
-        item_dict = {"type": self.EVENT_LOG,
-                     "timestamp": timestamp,
-                     "level": self.LOG_LEVEL_WARN,
-                     "source": source,
-                     "message": message}
-        self.__q(item_dict)
+        self._enqueue_line((timestamp, source, self.LOG_LEVEL_WARN, message, None))
 
     def log_error(self, timestamp, source, message):
-        item_dict = {"type": self.EVENT_LOG,
-                     "timestamp": timestamp,
-                     "level": self.LOG_LEVEL_ERROR,
-                     "source": source,
-                     "message": message}
-        self.__q(item_dict)
+        self._enqueue_line((timestamp, source, self.LOG_LEVEL_ERROR, message, None))
 
     def log_critical(self, timestamp, source, message):
-        item_dict = {"type": self.EVENT_LOG,
-                     "timestamp": timestamp,
-                     "level": self.LOG_LEVEL_CRITICAL,
-                     "source": source,
-                     "message": message}
-        self.__q(item_dict)
+        self._enqueue_line((timestamp, source, self.LOG_LEVEL_CRITICAL, message, None))
 
     def log(self, timestamp, source, message, level=LOG_LEVEL_INFO):
-        item_dict = {"type": self.EVENT_LOG,
-                     "timestamp": timestamp,
-                     "level": level,
-                     "source": source,
-                     "message": message}
-        self.__q(item_dict)
+        self._enqueue_line((timestamp, source, level, message, None))
 
     def stopped(self):
         return self._stop_event.is_set()
 
+    def call_later(self, delay, fn, *args):
+        """ Call fn(*args) on the Logger thread after delay seconds
+        - fn can log, ie a polled log source, lines logged on the Logger thread
+          are never blocked by a full queue, with POLICY_BLOCK they go over
+          queue_max, a fn that logs without end grows the queue without end
+
+        :return: ScheduledCall, cancel() to stop it
+        """
+        return self._sched.call_later(delay, fn, *args)
+
+    def call_every(self, period, fn, *args, delay=None):
+        """ Call fn(*args) on the Logger thread every period seconds, the first call after delay, default period
+        - fn can log, see call_later()
+
+        :return: ScheduledCall, cancel() to stop it
+        """
+        return self._sched.call_every(period, fn, *args, delay=delay)
+
     def shutdown(self):
         item_dict = {"type": self.EVENT_SHUTDOWN}
         self.__q(item_dict)
 
     def _event_shutdown(self):
         self._stop_event.set()
+        if self._spill:
+            self._spill.close()
+        if self._history is not None:
+            self._history.close()
+
+    def _create_queue(self, queue_max, queue_policy):
+        return LogQueue(queue_max, queue_policy, metrics=self.metrics)
+
+    def _wait_timeout(self):
+        """ max seconds to wait for the queue, until the next timer, or shm_poll with a shm_ring """
+        timeout = self._sched.timeout()
+        if self._shm_poll is not None and (timeout is None or timeout > self._shm_poll):
+            return self._shm_poll
+        return timeout
+
+    def _get_batch(self):
+        """ Wait for the next event, then drain whatever else is queued
+        - stops at batch_max events, or when batch_time seconds have been spent draining
+        - waits until the next timer is due, with a shm_ring at most shm_poll
+          seconds, then the ring is drained
+        """
+        try:
+            items = [self._q.get(block=True, timeout=self._wait_timeout())]
+        except queue.Empty:
+            items = []
+
+        deadline = time.monotonic() + self._batch_time
+        while items and len(items) < self._batch_max:
+            try:
+                items.append(self._q.get_nowait())
+            except queue.Empty:
+                break
+
+            if time.monotonic() > deadline:
+                break
+
+        self._drain_shm(items)
+        return items
+
+    def _drain_shm(self, items):
+        if self._shm_ring is not None:
+            lines, dropped = self._shm_ring.drain(self._batch_max)
+            items.extend(lines)
+            self._shm_dropped += dropped
 
     def run(self):
         self.logger.info(f"{self._tag_root} run thread started")
+        self._q.consumer_ident = get_ident()  # lines logged by scheduled calls must not block
         while not self.stopped():
+            self._handle_batch(self._get_batch())
+            self._sched.run_due()
 
-            try:
-                item = self._q.get(block=True)
-                self.logger.debug(item)
+        self.logger.info(f"{self._tag_root} run thread stopped")
+
+    def _handle_batch(self, items):
+        """ Handle a batch of queued events and log lines, under the lock
+        - an error in a log line flush or an event handler is logged and only
+          costs that flush or event, the rest of the batch is still handled
+        """
+        self.logger.debug(f"batch of {len(items)}")
 
-                with self._lock:
-                    if item["type"] == self.EVENT_LOG:
-                        self._event_log(item)
+        dropped = self._q.take_dropped() + self._shm_dropped
+        self._shm_dropped = 0
+        if dropped:
+            items.append(("--", "Logger", self.LOG_LEVEL_WARN, f"{dropped} lines dropped", None))
 
-                    elif item["type"] == self.EVENT_CLEAR:
-                        self._event_clear(item)
+        with self._lock:
+            log_items = []  # consecutive log lines are coalesced into one table update
+            for item in items:
+                if item.__class__ is tuple:
+                    log_items.append(item)
+                    continue
 
-                    elif item["type"] == self.EVENT_EXPORT:
-                        self._event_export(item)
+                if item["type"] == self.EVENT_LOG:
+                    log_items.append((item["timestamp"], item["source"], item["level"], item["message"], None))
+                    continue
 
-                    elif item["type"] == self.EVENT_SHUTDOWN:
-                        self._event_shutdown()
+                if item["type"] == self.EVENT_WAKE:  # only woke the loop for a timer
+                    continue
 
-                    else:
-                        self.logger.error("Unknown event: {}".format(item["type"]))
+                if log_items:
+                    self._log_batch(log_items)
+                    log_items = []
 
-            except queue.Empty:
-                pass
-            except Exception as e:
-                self.logger.error("Error processing event {}, {}".format(e, item["type"]))
-                traceback.print_exc()
+                self._handle_event(item)
+                if item["type"] == self.EVENT_SHUTDOWN:
+                    break
+
+            if log_items:
+                self._log_batch(log_items)
+
+    def _handle_event(self, item):
+        """ Handle one queued event, self._lock is held """
+        try:
+            if self.metrics is not None:
+                t0 = time.perf_counter()
+
+            if item["type"] == self.EVENT_CLEAR:
+                self._event_clear(item)
+
+            elif item["type"] == self.EVENT_EXPORT:
+                self._event_export(item)
+
+            elif item["type"] == self.EVENT_EXPORT_DONE:
+                self._event_export_done(item)
+
+            elif item["type"] == self.EVENT_SEARCH:
+                self._event_search(item)
+
+            elif item["type"] == self.EVENT_SEARCH_DONE:
+                self._event_search_done(item)
+
+            elif item["type"] == self.EVENT_SEARCH_NAV:
+                self._event_search_nav(item)
+
+            elif item["type"] == self.EVENT_HISTORY:
+                self._event_history(item)
+
+            elif item["type"] == self.EVENT_SHUTDOWN:
+                self._event_shutdown()
+
+            else:
+                self.logger.error("Unknown event: {}".format(item["type"]))
+
+            if self.metrics is not None:
+                self.metrics.handled_event(item["type"], time.perf_counter() - t0)
+
+        except Exception as e:
+            self.logger.error("Error processing event {}, {}".format(e, item.get("type")))
+            traceback.print_exc()
+
+
+class LoggerHandler(logging.Handler):
+    """ python logging Handler that feeds a Logger
+    - record.name is the source, record levels map onto Logger.LOG_LEVEL_*,
+      below DEBUG is TRACE
+    - the timestamp is seconds since the logging module was loaded, ms resolution
+    - records are queued as (timestamp, source, level, msg, args) tuples,
+      msg % args is done on the Logger thread, so don't log args that are
+      changed after the call
+    - set the handler level to drop records before they are queued, the
+      logging module checks it before the handler is called
+    - records made on the Logger thread are dropped, the Logger logs its own
+      batches and events, they would feed back into the Logger forever when
+      the handler is on a logger the Logger reports to, ie the root logger
+
+        handler = LoggerHandler(mylogger, level=logging.INFO)
+        logging.getLogger("uart").addHandler(handler)
 
-            time.sleep(0)  # allow other threads to run if any, in the case that the queue is full
+    """
+
+    def __init__(self, logger, level=logging.NOTSET):
+        super().__init__(level)
+        self._enqueue_line = logger._enqueue_line
+        self._thread = logger
+        self._levels = [self._map_level(logger, n) for n in range(logging.CRITICAL + 1)]
+        self._level_critical = logger.LOG_LEVEL_CRITICAL
+
+    @staticmethod
+    def _map_level(logger, levelno):
+        if levelno >= logging.CRITICAL:
+            return logger.LOG_LEVEL_CRITICAL
+        if levelno >= logging.ERROR:
+            return logger.LOG_LEVEL_ERROR
+        if levelno >= logging.WARNING:
+            return logger.LOG_LEVEL_WARN
+        if levelno >= logging.INFO:
+            return logger.LOG_LEVEL_INFO
+        if levelno >= logging.DEBUG:
+            return logger.LOG_LEVEL_DEBUG
+        return logger.LOG_LEVEL_TRACE
+
+    def handle(self, record):
+        # the queue is thread safe, skip the per record handler lock
+        if record.thread == self._thread.ident:
+            return False
+        if self.filters and not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record):
+        try:
+            levelno = record.levelno
+            level = self._levels[levelno] if 0 <= levelno <= logging.CRITICAL else self._level_critical
+            msg = record.msg
+            if record.exc_info:
+                msg = f"{record.getMessage()}\n{logging.Formatter().formatException(record.exc_info)}"
+                self._enqueue_line((round(record.relativeCreated / 1000, 3), record.name, level, msg, None))
+                return
+
+            self._enqueue_line((round(record.relativeCreated / 1000, 3), record.name, level, msg, record.args))
+
+        except Exception:
+            self.handleError(record)
+
+
+class AsyncLogger(Logger):
+    """ Logger whose thread runs an asyncio event loop
+    - coroutines can run on the Logger's loop, see submit(), ie thousands of
+      device sessions sharing one loop, and log with
+
+        await mylogger.log(timestamp, source, message, level)
+
+      which waits for room (queue_max with POLICY_BLOCK) instead of blocking
+      the loop.  log() can be awaited from other loops too, with a thread hop.
+    - log_info() etc. are unchanged, thread safe and do not wait
+    - batches are handled on the loop the same way as Logger, coroutines on the
+      loop run between batches
+    - coroutines still running at shutdown are cancelled
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        super().__init__(*args, **kwargs)
+
+    def _create_queue(self, queue_max, queue_policy):
+        return AsyncLogQueue(self._loop, queue_max, queue_policy, metrics=self.metrics)
+
+    async def log(self, timestamp, source, message, level=Logger.LOG_LEVEL_INFO):
+        await self._q.put_line_async((timestamp, source, level, message, None))
+
+    def submit(self, coro):
+        """ Run a coroutine on the Logger's event loop, from any thread
+
+        :param coro: coroutine
+        :return: concurrent.futures.Future of the coroutine result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _main(self):
+        while not self.stopped():
+            items = await self._q.get_batch(self._batch_max, self._wait_timeout())
+            self._drain_shm(items)
+            self._handle_batch(items)
+            self._sched.run_due()
+
+    def run(self):
+        self.logger.info(f"{self._tag_root} run thread started")
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        finally:
+            self._loop.close()
 
         self.logger.info(f"{self._tag_root} run thread stopped")
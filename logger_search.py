@@ -0,0 +1,136 @@
+import re
+import bisect
+from array import array
+from threading import Thread, Event
+
+
+class SearchIndex(object):
+    """ Incremental inverted index of log messages, token -> row indexes
+    - tokens are lower case words (regex \\w+)
+    - rows are absolute row indexes (see LogStore), added in increasing order,
+      so every posting list is sorted
+    - a query returns the rows that contain all the tokens of the query text
+
+    """
+
+    TOKEN_RE = re.compile(r"\w+")
+
+    def __init__(self):
+        self._postings = {}  # token -> array('q') of row indexes
+        self.base = 0        # rows below base have been pruned
+
+    def tokens(self, text):
+        return set(self.TOKEN_RE.findall(text.lower()))
+
+    def add(self, idx, msg):
+        postings = self._postings
+        for token in self.tokens(msg):
+            rows = postings.get(token)
+            if rows is None:
+                rows = postings[token] = array("q")
+            rows.append(idx)
+
+    def query(self, text, base=0):
+        """ Rows that contain all the tokens of text
+
+        :param text: query string
+        :param base: ignore rows below base, ie evicted rows
+        :return: sorted list of row indexes
+        """
+        tokens = self.tokens(text)
+        if not tokens:
+            return []
+
+        lists = []
+        for token in tokens:
+            rows = self._postings.get(token)
+            if rows is None:
+                return []
+            lists.append(rows)
+
+        lists.sort(key=len)
+        shortest, others = lists[0], lists[1:]
+        matches = []
+        for idx in shortest[bisect.bisect_left(shortest, base):]:
+            for rows in others:
+                i = bisect.bisect_left(rows, idx)
+                if i == len(rows) or rows[i] != idx:
+                    break
+            else:
+                matches.append(idx)
+
+        return matches
+
+    def evict(self, base):
+        """ Drop rows below base
+        - only prunes once base has moved at least as many rows as there are
+          tokens, which keeps the cost amortized O(1) per evicted row
+        """
+        if base - self.base < max(len(self._postings), 1024):
+            return
+
+        for token in list(self._postings):
+            rows = self._postings[token]
+            i = bisect.bisect_left(rows, base)
+            if i == len(rows):
+                del self._postings[token]
+            elif i:
+                del rows[:i]
+
+        self.base = base
+
+    def clear(self):
+        self._postings = {}
+        self.base = 0
+
+
+class RegexSearch(Thread):
+    """ Scan log messages for a compiled regex on a background thread
+    - rows [store.base, store.end) at the time of the call are scanned,
+      CHUNK_ROWS at a time, the lock is only held while a chunk is read
+    - when done, done_cb(matches, end) is called on this thread, matches is
+      the sorted list of matching row indexes below end
+    - rows that are evicted while scanning are skipped
+
+    """
+
+    CHUNK_ROWS = 10000
+
+    def __init__(self, store, lock, pattern, done_cb):
+        super().__init__()
+        self._store = store
+        self._lock = lock
+        self._pattern = pattern
+        self._done_cb = done_cb
+        self._cancel_event = Event()
+        self._idx = store.base
+        self._end = store.end
+        self.daemon = True
+        self.start()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self):
+        matches = []
+        idx = self._idx
+        while idx < self._end:
+            if self._cancel_event.is_set():
+                return
+
+            with self._lock:
+                store = self._store
+                idx = max(idx, store.base)
+                stop = min(idx + self.CHUNK_ROWS, self._end, store.end)
+                if stop <= idx:  # store was cleared
+                    break
+
+                search = self._pattern.search
+                for i in range(idx, stop):
+                    if search(store.message(store.slot(i))):
+                        matches.append(i)
+
+            idx = stop
+
+        if not self._cancel_event.is_set():
+            self._done_cb(matches, self._end)
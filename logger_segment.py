@@ -0,0 +1,187 @@
+import os
+import mmap
+import struct
+import operator
+
+
+class SegmentStore(object):
+    """ Append-only on-disk log line store
+    - a directory of segments, each segment is two files,
+        NNNNNN.hdr, fixed size record headers, see HEADER
+        NNNNNN.dat, message blobs, utf-8
+      and sources.txt, the source names, one per line, the line number is the source id
+    - every open starts a new segment for writing, a segment is closed and a
+      new one started when its .dat file reaches segment_bytes
+    - the segments that exist when the store is opened are the history, they
+      are memory mapped read only, and read on demand, opening costs a stat
+      and an mmap per segment no matter how many lines there are
+    - history rows are numbered 0 .. history_len() - 1, oldest first
+
+    """
+
+    # timestamp, blob offset, blob length, source id, timestamp kind, log level
+    # - the timestamp field is an int64, or a double for TS_FLOAT, see HEADER_FLOAT,
+    #   so int timestamps, ie time.time_ns(), keep all their digits
+    # - TS_STR timestamps are stored at the front of the blob, the timestamp
+    #   field is their length in bytes
+    HEADER = struct.Struct("<qQIHBb")
+    HEADER_FLOAT = struct.Struct("<dQIHBb")
+    HEADER_SOURCE = 20  # byte offset of the source id in HEADER
+    HEADER_LEVEL = 23   # byte offset of the log level in HEADER
+
+    TS_INT = 0
+    TS_FLOAT = 1
+    TS_STR = 2
+
+    SOURCES_FILE = "sources.txt"
+
+    def __init__(self, path, segment_bytes=64 * 1024 * 1024):
+        self._path = path
+        self._segment_bytes = segment_bytes
+        os.makedirs(path, exist_ok=True)
+
+        self.source_names = []
+        self._source_ids = {}
+        sources_file = os.path.join(path, self.SOURCES_FILE)
+        if os.path.exists(sources_file):
+            with open(sources_file, encoding="utf-8") as f:
+                for name in f.read().split("\n")[:-1]:
+                    self._source_ids[name] = len(self.source_names)
+                    self.source_names.append(name)
+        self._sources_f = open(sources_file, "a", encoding="utf-8")
+
+        # history segments, [first row, rows, hdr mmap, dat mmap]
+        self._segments = []
+        self._starts = []
+        rows = 0
+        numbers = sorted(int(f[:-4]) for f in os.listdir(path) if f.endswith(".hdr"))
+        for n in numbers:
+            hdr_size = os.path.getsize(self._file(n, "hdr"))
+            count = hdr_size // self.HEADER.size
+            if count == 0:
+                continue
+
+            hdr = self._map(self._file(n, "hdr"))
+            dat = self._map(self._file(n, "dat"))
+            self._segments.append([rows, count, hdr, dat])
+            self._starts.append(rows)
+            rows += count
+
+        self._history_len = rows
+        self._number = numbers[-1] if numbers else 0
+        self._hdr_f = None
+        self._dat_f = None
+        self._open_segment()
+
+    def _file(self, number, ext):
+        return os.path.join(self._path, f"{number:06d}.{ext}")
+
+    @staticmethod
+    def _map(filename):
+        with open(filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _open_segment(self):
+        if self._hdr_f:
+            self._hdr_f.close()
+            self._dat_f.close()
+
+        self._number += 1
+        self._hdr_f = open(self._file(self._number, "hdr"), "ab")
+        self._dat_f = open(self._file(self._number, "dat"), "ab")
+        self._dat_offset = 0
+
+    def _source_id(self, source):
+        sid = self._source_ids.get(source)
+        if sid is None:
+            sid = self._source_ids[source] = len(self.source_names)
+            self.source_names.append(source)
+            self._sources_f.write(f"{source}\n")
+            self._sources_f.flush()
+        return sid
+
+    def append(self, lines):
+        """ Append a batch of log lines
+
+        :param lines: list of (timestamp, source, log_level, msg)
+        :return: None
+        """
+        pack = self.HEADER.pack
+        pack_float = self.HEADER_FLOAT.pack
+        headers = []
+        blobs = []
+        offset = self._dat_offset
+        for timestamp, source, log_level, msg in lines:
+            blob = msg.encode()
+            sid = self._source_id(source)
+            if type(timestamp) is float:
+                headers.append(pack_float(timestamp, offset, len(blob), sid, self.TS_FLOAT, log_level))
+            else:
+                if type(timestamp) is int:
+                    ts, kind = timestamp, self.TS_INT
+                else:
+                    ts_bytes = str(timestamp).encode()[:255]
+                    ts, kind = len(ts_bytes), self.TS_STR
+                    blob = ts_bytes + blob
+                headers.append(pack(ts, offset, len(blob), sid, kind, log_level))
+            blobs.append(blob)
+            offset += len(blob)
+
+        self._dat_f.write(b"".join(blobs))
+        self._hdr_f.write(b"".join(headers))
+        self._dat_f.flush()
+        self._hdr_f.flush()
+        self._dat_offset = offset
+
+        if self._dat_offset >= self._segment_bytes:
+            self._open_segment()
+
+    def history_len(self):
+        return self._history_len
+
+    def _locate(self, row):
+        i = len(self._starts) - 1
+        while self._starts[i] > row:  # few segments, usually the last
+            i -= 1
+        return self._segments[i]
+
+    def row(self, row):
+        """ history row as [timestamp, source, log_level, msg], timestamp as a string """
+        first, count, hdr, dat = self._locate(row)
+        pos = (row - first) * self.HEADER.size
+        ts, offset, length, sid, kind, level = self.HEADER.unpack_from(hdr, pos)
+        blob = dat[offset:offset + length]
+        if kind == self.TS_STR:
+            timestamp, msg = blob[:ts].decode(), blob[ts:].decode()
+        else:
+            if kind == self.TS_FLOAT:
+                ts = self.HEADER_FLOAT.unpack_from(hdr, pos)[0]
+            timestamp = str(ts)
+            msg = blob.decode()
+        return [timestamp, self.source_names[sid], level, msg]
+
+    def mask(self, level_min, source_show):
+        """ Visible history row mask, computed over the mapped headers
+
+        :param level_min: rows with a level below level_min are hidden
+        :param source_show: list of [True|False], indexed by source id
+        :return: bytes, 1 for a visible row, in row order
+        """
+        level_show = [level >= level_min for level in range(128)]
+        size = self.HEADER.size
+        parts = []
+        for first, count, hdr, dat in self._segments:
+            view = memoryview(hdr)[:count * size]
+            levels = view.cast("b")[self.HEADER_LEVEL::size]
+            sources = view.cast("H")[self.HEADER_SOURCE // 2::size // 2]
+            parts.append(bytes(map(operator.and_,
+                                   map(level_show.__getitem__, levels),
+                                   map(source_show.__getitem__, sources))))
+        return b"".join(parts)
+
+    def close(self):
+        self._hdr_f.close()
+        self._dat_f.close()
+        self._sources_f.close()
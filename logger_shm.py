@@ -0,0 +1,189 @@
+import struct
+from multiprocessing import shared_memory
+
+
+def shm_attach(name):
+    # python >= 3.13, don't let a child process' resource tracker unlink the ring
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class ShmLogRing(object):
+    """ Log line ring buffers in shared memory, for log producers in other processes
+    - one lane per producer process, each lane is a single producer / single
+      consumer ring, so no locks are needed, the producer only writes head,
+      the consumer (the Logger thread) only writes tail
+    - head and tail are free running counters, a record is published by
+      writing it and then advancing head
+    - records are fixed size, see RECORD, the source and message are utf-8
+      and truncated to fit
+    - the timestamp is an int, a float, or a str, ie "12:00:01", a str
+      timestamp is stored before the message, truncated to TS_STR_MAX bytes
+    - a full lane drops the new line and counts it, producers never block
+    - the Logger polls the ring every shm_poll seconds while its queue is idle
+
+    Create the ring in the parent, pass it to the Logger, and give each
+    producer process the ring name and its own lane,
+
+        ring = ShmLogRing(lanes=4)
+        mylogger = Logger("mylogger", shm_ring=ring)
+        p = Process(target=worker, args=(ring.name, 0))
+
+        def worker(name, lane):
+            log = ShmLogProducer(name, lane)
+            log.log(time.time(), "ADC", "sampling", Logger.LOG_LEVEL_INFO)
+
+    Close and unlink the ring only after the Logger thread has stopped,
+
+        mylogger.shutdown()
+        mylogger.join()
+        ring.close()
+        ring.unlink()
+
+    NOTE: relies on 8 byte aligned writes being atomic and stores not being
+          reordered (x86-64, and aarch64 in practice with CPython).
+
+    """
+
+    # timestamp, log level, timestamp kind, source length, message length, str timestamp length
+    # - the timestamp is an int64, or a double for TS_FLOAT, see RECORD_FLOAT,
+    #   so int timestamps, ie time.time_ns(), keep all their digits
+    RECORD = struct.Struct("<qbBBHB2x")
+    RECORD_FLOAT = struct.Struct("<dbBBHB2x")
+    SOURCE_MAX = 32
+    TS_STR_MAX = 32
+    MSG_OFFSET = 16 + SOURCE_MAX
+
+    LANE_HEADER = 128  # head @0, dropped @8, tail @64, separate cache lines
+    HEAD = 0
+    DROPPED = 8
+    TAIL = 64
+
+    TS_INT = 0
+    TS_FLOAT = 1
+    TS_STR = 2
+
+    U64 = struct.Struct("<Q")
+
+    def __init__(self, lanes=4, slots=4096, record_size=256, name=None):
+        self.lanes = lanes
+        self.slots = slots
+        self.record_size = record_size
+        self.lane_size = self.LANE_HEADER + slots * record_size
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=lanes * self.lane_size)
+
+        self.name = self._shm.name
+        self._tails = [0] * lanes
+        self._dropped_seen = [0] * lanes
+
+    def lane_offset(self, lane):
+        return lane * self.lane_size
+
+    def drain(self, max_lines=4096):
+        """ Read queued lines from all the lanes
+
+        :param max_lines: max lines read per lane
+        :return: list of (timestamp, source, level, message, None), and the number of dropped lines
+        """
+        buf = self._shm.buf
+        unpack_from = self.RECORD.unpack_from
+        unpack_float_from = self.RECORD_FLOAT.unpack_from
+        u64 = self.U64
+        lines = []
+        dropped = 0
+        for lane in range(self.lanes):
+            off = self.lane_offset(lane)
+            head = u64.unpack_from(buf, off + self.HEAD)[0]
+            tail = self._tails[lane]
+            stop = min(head, tail + max_lines)
+            for i in range(tail, stop):
+                rec = off + self.LANE_HEADER + (i % self.slots) * self.record_size
+                ts, level, kind, src_len, msg_len, ts_len = unpack_from(buf, rec)
+                source = bytes(buf[rec + 16:rec + 16 + src_len]).decode(errors="replace")
+                msg_start = rec + self.MSG_OFFSET
+                if kind == self.TS_STR:
+                    ts = bytes(buf[msg_start:msg_start + ts_len]).decode(errors="replace")
+                    msg_start += ts_len
+                elif kind == self.TS_FLOAT:
+                    ts = unpack_float_from(buf, rec)[0]
+                msg = bytes(buf[msg_start:msg_start + msg_len]).decode(errors="replace")
+                lines.append((ts, source, level, msg, None))
+
+            if stop != tail:
+                self._tails[lane] = stop
+                u64.pack_into(buf, off + self.TAIL, stop)
+
+            # dropped is only written by the producer, count the change since the last drain
+            n = u64.unpack_from(buf, off + self.DROPPED)[0]
+            dropped += n - self._dropped_seen[lane]
+            self._dropped_seen[lane] = n
+
+        return lines, dropped
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+class ShmLogProducer(object):
+    """ Writes log lines into one lane of a ShmLogRing, use from a producer process
+    - only one producer per lane
+    - log() returns False if the lane was full and the line was dropped
+    - timestamp must be an int, a float or a str, see ShmLogRing
+
+    """
+
+    def __init__(self, name, lane, slots=4096, record_size=256):
+        """
+        :param name: ShmLogRing.name
+        :param lane: this producer's lane, 0 .. lanes - 1
+        :param slots: must match the ShmLogRing
+        :param record_size: must match the ShmLogRing
+        """
+        self._shm = shm_attach(name)
+        self._buf = self._shm.buf
+        self._slots = slots
+        self._record_size = record_size
+        self._off = lane * (ShmLogRing.LANE_HEADER + slots * record_size)
+        self._head = ShmLogRing.U64.unpack_from(self._buf, self._off + ShmLogRing.HEAD)[0]
+        self._msg_max = record_size - ShmLogRing.MSG_OFFSET
+
+    def log(self, timestamp, source, message, level):
+        buf = self._buf
+        off = self._off
+        u64 = ShmLogRing.U64
+        tail = u64.unpack_from(buf, off + ShmLogRing.TAIL)[0]
+        if self._head - tail >= self._slots:
+            dropped = u64.unpack_from(buf, off + ShmLogRing.DROPPED)[0]
+            u64.pack_into(buf, off + ShmLogRing.DROPPED, dropped + 1)
+            return False
+
+        record = ShmLogRing.RECORD
+        if isinstance(timestamp, str):
+            kind, ts, ts_str = ShmLogRing.TS_STR, 0, timestamp.encode()[:ShmLogRing.TS_STR_MAX]
+        elif type(timestamp) is int:
+            kind, ts, ts_str = ShmLogRing.TS_INT, timestamp, b""
+        else:
+            kind, ts, ts_str = ShmLogRing.TS_FLOAT, float(timestamp), b""
+            record = ShmLogRing.RECORD_FLOAT
+        src = source.encode()[:ShmLogRing.SOURCE_MAX]
+        msg = message.encode()[:self._msg_max - len(ts_str)]
+        rec = off + ShmLogRing.LANE_HEADER + (self._head % self._slots) * self._record_size
+        record.pack_into(buf, rec, ts, level, kind, len(src), len(msg), len(ts_str))
+        buf[rec + 16:rec + 16 + len(src)] = src
+        msg_start = rec + ShmLogRing.MSG_OFFSET
+        buf[msg_start:msg_start + len(ts_str)] = ts_str
+        msg_start += len(ts_str)
+        buf[msg_start:msg_start + len(msg)] = msg
+
+        self._head += 1
+        u64.pack_into(buf, off + ShmLogRing.HEAD, self._head)  # publish
+        return True
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
@@ -0,0 +1,241 @@
+import os
+import operator
+from array import array
+from itertools import compress
+
+
+class LogStore(object):
+    """ Columnar log line store, optionally bounded to a fixed capacity
+    - rows are addressed by an absolute row index, which never changes for a row
+    - when full, appending a row evicts the oldest row, base moves up by one,
+      nothing is renumbered
+    - capacity=None is unbounded
+    - generation changes on clear(), rows are numbered from 0 again, so a
+      reader holding row indexes checks it, see LogExport, clear() must be
+      called under the same lock as the readers, ie Logger.clear()
+
+    Columns, indexed by slot (see slot()):
+      - levels, array('b') of LOG_LEVEL_*
+      - sources, array('H') of source ids, see source_names / source_id()
+      - timestamps, array('q') or array('d') while all timestamps are int or
+        float, otherwise a list of strings
+      - messages, utf-8 encoded in an append-only bytearray arena, located by
+        msg_start (absolute arena offset) and msg_len
+
+    """
+
+    TS_INT = "q"
+    TS_FLOAT = "d"
+    TS_STR = "s"
+
+    def __init__(self, capacity=None):
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"capacity {capacity} must be >= 1")
+
+        self._capacity = capacity
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        self.generation += 1
+        self.base = 0  # absolute index of the oldest row
+        self.end = 0   # absolute index of the next row
+
+        self.levels = array("b")
+        self.sources = array("H")
+        self.source_names = []
+        self._source_ids = {}
+
+        self._ts_kind = None
+        self.timestamps = None
+
+        self._arena = bytearray()
+        self._arena_base = 0  # absolute offset of self._arena[0], moves when the arena is compacted
+        self.msg_start = array("Q")
+        self.msg_len = array("L")
+
+    def __len__(self):
+        return self.end - self.base
+
+    def __getitem__(self, idx):
+        """ row idx as [timestamp, source, log_level, msg], timestamp as a string """
+        if idx < self.base or idx >= self.end:
+            raise IndexError(f"row {idx} not in [{self.base}, {self.end})")
+
+        slot = self.slot(idx)
+        return [self.timestamp(slot), self.source_names[self.sources[slot]], self.levels[slot], self.message(slot)]
+
+    def __iter__(self):
+        for idx in range(self.base, self.end):
+            yield self[idx]
+
+    def items(self):
+        """ iterate (absolute index, row) from oldest to newest """
+        for idx in range(self.base, self.end):
+            yield idx, self[idx]
+
+    def slot(self, idx):
+        """ column position of absolute row index idx """
+        if self._capacity is None:
+            return idx
+        return idx % self._capacity
+
+    def index(self, slot):
+        """ absolute row index of the row at column position slot """
+        if not self.is_full():
+            return slot
+        return self.base + (slot - self.slot(self.base)) % self._capacity
+
+    def mask(self, level_min, source_show):
+        """ Visible row mask, computed over the whole level and source columns
+
+        :param level_min: rows with a level below level_min are hidden
+        :param source_show: list of [True|False], indexed by source id
+        :return: bytes, 1 for a visible row, in slot order
+        """
+        level_show = [level >= level_min for level in range(128)]
+        return bytes(map(operator.and_,
+                         map(level_show.__getitem__, self.levels),
+                         map(source_show.__getitem__, self.sources)))
+
+    def indexes(self, mask):
+        """ absolute row indexes of the rows set in a slot order mask, oldest first """
+        n = len(mask)
+        b = self.slot(self.base) if n else 0
+        if b == 0:
+            return list(compress(range(self.base, self.end), mask))
+
+        return (list(compress(range(self.base, self.base + n - b), mask[b:])) +
+                list(compress(range(self.base + n - b, self.end), mask[:b])))
+
+    def is_full(self):
+        return self._capacity is not None and len(self.levels) == self._capacity
+
+    def source_id(self, source):
+        """ intern source, returns its id """
+        sid = self._source_ids.get(source)
+        if sid is None:
+            sid = self._source_ids[source] = len(self.source_names)
+            self.source_names.append(source)
+        return sid
+
+    def timestamp(self, slot):
+        if self._ts_kind == self.TS_STR:
+            return self.timestamps[slot]
+        return str(self.timestamps[slot])
+
+    def message(self, slot):
+        start = self.msg_start[slot] - self._arena_base
+        return self._arena[start:start + self.msg_len[slot]].decode()
+
+    def _ts_store(self, timestamp):
+        """ convert timestamp for the timestamp column, switching the column to strings if needed """
+        kind = self.TS_STR
+        if type(timestamp) is int:
+            kind = self.TS_INT
+        elif type(timestamp) is float:
+            kind = self.TS_FLOAT
+
+        if self._ts_kind is None:
+            self._ts_kind = kind
+            self.timestamps = [] if kind == self.TS_STR else array(kind)
+
+        elif kind != self._ts_kind and self._ts_kind != self.TS_STR:
+            self._ts_kind = self.TS_STR
+            self.timestamps = [str(t) for t in self.timestamps]
+
+        if self._ts_kind == self.TS_STR and kind != self.TS_STR:
+            return str(timestamp)
+        return timestamp
+
+    def append(self, timestamp, source, log_level, msg):
+        """ Append a row
+
+        :param timestamp: int, float, or string
+        :param source: string
+        :param log_level: LOG_LEVEL_*
+        :param msg: string
+        :return: True if the oldest row was evicted
+        """
+        ts = self._ts_store(timestamp)
+        sid = self.source_id(source)
+        encoded = msg.encode()
+        start = self._arena_base + len(self._arena)
+        self._arena += encoded
+
+        evicted = self.is_full()
+        if evicted:
+            slot = self.end % self._capacity
+            self.levels[slot] = log_level
+            self.sources[slot] = sid
+            self.timestamps[slot] = ts
+            self.msg_start[slot] = start
+            self.msg_len[slot] = len(encoded)
+            self.base += 1
+            self._compact_arena()
+
+        else:
+            self.levels.append(log_level)
+            self.sources.append(sid)
+            self.timestamps.append(ts)
+            self.msg_start.append(start)
+            self.msg_len.append(len(encoded))
+
+        self.end += 1
+        return evicted
+
+    def _compact_arena(self):
+        # drop evicted messages from the front of the arena once they are
+        # more than half of it, amortized O(1) per row
+        dead = self.msg_start[self.slot(self.base)] - self._arena_base
+        if dead > len(self._arena) // 2:
+            del self._arena[:dead]
+            self._arena_base += dead
+
+
+class SpillFile(object):
+    """ Rotating text file that evicted log rows are written to
+    - one row per line, same format as the Logger export
+    - when the file reaches max_bytes it is renamed to <filename>.1, the older
+      files shift up to <filename>.<backup_count>, the oldest is deleted
+
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self._filename = filename
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._f = open(self._filename, "a")
+
+    def _rotate(self):
+        self._f.close()
+        for i in range(self._backup_count - 1, 0, -1):
+            src = f"{self._filename}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self._filename}.{i + 1}")
+
+        if self._backup_count > 0:
+            os.replace(self._filename, f"{self._filename}.1")
+        else:
+            os.remove(self._filename)
+
+        self._f = open(self._filename, "a")
+
+    def write(self, lines):
+        """ Write a batch of lines, rotates the file first if it is full
+
+        :param lines: list of strings, without line endings
+        :return: None
+        """
+        if not lines:
+            return
+
+        if self._f.tell() >= self._max_bytes:
+            self._rotate()
+
+        self._f.write("\n".join(lines))
+        self._f.write("\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
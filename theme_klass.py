@@ -0,0 +1,141 @@
+import dearpygui.dearpygui as dpg
+from threading import Lock
+
+
+class Themes(object):
+    """ Shared DPG themes, built the first time they are asked for, see get()
+    - a theme is described by a spec, a tuple of (item type, items) components,
+      items are (COLOR, target, color) and (STYLE, target, x[, y]), ie
+
+        ((dpg.mvButton, ((Themes.COLOR, dpg.mvThemeCol_Button, (66, 245, 126)),
+                         (Themes.STYLE, dpg.mvStyleVar_FrameRounding, 15))),)
+
+    - a theme is built once per spec, identical specs share the theme, so
+      any number of widgets with the same look is one DPG theme, ie the
+      level themes of all the Loggers and the states of all the ToggleButtons
+    - a color can be a palette key instead of a color, ie "text", it is
+      looked up in the current palette, see PALETTES
+    - use_palette("light") recolors every theme built so far, and the global
+      theme, with one call, the widgets keep their bound themes
+
+    """
+
+    COLOR = "color"
+    STYLE = "style"
+
+    PALETTE_DARK = "dark"
+    PALETTE_LIGHT = "light"
+
+    PALETTES = {
+        PALETTE_DARK: {
+            "window_bg": (15, 15, 15, 240),
+            "child_bg": (0, 0, 0, 0),
+            "frame_bg": (41, 74, 122, 138),
+            "header": (66, 150, 250, 79),
+            "text": (255, 255, 255, 255),
+            "log_trace": (0, 255, 0, 255),
+            "log_debug": (64, 128, 255, 255),
+            "log_info": (255, 255, 255, 255),
+            "log_warn": (255, 255, 0, 255),
+            "log_error": (255, 0, 0, 255),
+            "log_critical": (255, 0, 0, 255),
+        },
+        PALETTE_LIGHT: {
+            "window_bg": (240, 240, 240, 255),
+            "child_bg": (0, 0, 0, 0),
+            "frame_bg": (255, 255, 255, 255),
+            "header": (66, 150, 250, 79),
+            "text": (0, 0, 0, 255),
+            "log_trace": (0, 128, 0, 255),
+            "log_debug": (0, 64, 192, 255),
+            "log_info": (0, 0, 0, 255),
+            "log_warn": (160, 112, 0, 255),
+            "log_error": (200, 0, 0, 255),
+            "log_critical": (200, 0, 0, 255),
+        },
+    }
+
+    # the global theme of use_palette(), palette colors only
+    GLOBAL = ((0, ((COLOR, dpg.mvThemeCol_WindowBg, "window_bg"),
+                   (COLOR, dpg.mvThemeCol_ChildBg, "child_bg"),
+                   (COLOR, dpg.mvThemeCol_FrameBg, "frame_bg"),
+                   (COLOR, dpg.mvThemeCol_Header, "header"),
+                   (COLOR, dpg.mvThemeCol_Text, "text"))),)
+
+    _lock = Lock()
+    _palette = PALETTE_DARK
+    _themes = {}          # spec -> theme
+    _palette_items = []   # [(theme color item, palette key)], recolored by use_palette()
+
+    @classmethod
+    def get(cls, spec):
+        """ Theme of spec, built on the first call
+
+        :param spec: theme spec, see class doc
+        :return: DPG theme
+        """
+        theme = cls._themes.get(spec)
+        if theme is not None:
+            return theme
+
+        with cls._lock:
+            theme = cls._themes.get(spec)
+            if theme is None:
+                theme = cls._themes[spec] = cls._build(spec)
+        return theme
+
+    @classmethod
+    def _build(cls, spec):
+        palette = cls.PALETTES[cls._palette]
+        with dpg.theme() as theme:
+            for item_type, items in spec:
+                with dpg.theme_component(item_type):
+                    for kind, target, *values in items:
+                        if kind != cls.COLOR:
+                            dpg.add_theme_style(target, *values)
+
+                        elif isinstance(values[0], str):
+                            item = dpg.add_theme_color(target, palette[values[0]])
+                            cls._palette_items.append((item, values[0]))
+
+                        else:
+                            dpg.add_theme_color(target, *values)
+        return theme
+
+    @classmethod
+    def color(cls, key):
+        """ color of key in the current palette """
+        return cls.PALETTES[cls._palette][key]
+
+    @classmethod
+    def palette(cls):
+        """ name of the current palette """
+        return cls._palette
+
+    @classmethod
+    def use_palette(cls, name, bind_global=True):
+        """ Switch every palette color to the palette name, ie dark to light
+
+        :param name: key of PALETTES
+        :param bind_global: also bind the GLOBAL theme, for the window colors
+        """
+        palette = cls.PALETTES[name]
+        with cls._lock:
+            cls._palette = name
+            for item, key in cls._palette_items:
+                dpg.set_value(item, palette[key])
+
+        if bind_global:
+            dpg.bind_theme(cls.get(cls.GLOBAL))
+
+    @classmethod
+    def count(cls):
+        """ number of themes built """
+        return len(cls._themes)
+
+    @classmethod
+    def clear(cls):
+        """ forget the built themes, call after dpg.destroy_context() """
+        with cls._lock:
+            cls._themes = {}
+            cls._palette_items = []
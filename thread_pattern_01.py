@@ -8,8 +8,8 @@ their own thread via a class.
 """
 import dearpygui.dearpygui as dpg
 from threading import Thread, Lock, Event
+from worker_klass import Scheduler
 import queue
-import time
 import traceback
 import logging
 logger = logging.getLogger()
@@ -24,6 +24,7 @@ logger.setLevel(logging.INFO)
 class Worker(Thread):
 
     EVENT_SHUTDOWN = "EVENT_SHUTDOWN"
+    EVENT_WAKE = "EVENT_WAKE"
     EVENT_CB_BUTTON1 = "EVENT_CB_BUTTON1"
 
     def __init__(self, name="Worker"):
@@ -33,25 +34,34 @@ class Worker(Thread):
         self._q = queue.Queue()
         self._stop_event = Event()
 
+        # event type -> handler, events are (type, payload) tuples
+        self._handlers = {self.EVENT_SHUTDOWN: self._event_shutdown,
+                          self.EVENT_WAKE: lambda payload: None,
+                          self.EVENT_CB_BUTTON1: self._event_button1}
+
+        # timers run on this thread, the run loop waits for the next event
+        # or the next timer
+        self._sched = Scheduler(lambda: self.__q((self.EVENT_WAKE, None)))
+        self._sched.call_every(10.0, self._timer_status)
+
         # Note: you can create your dpg widgets here, create the widgets
         #       and put the callbacks in the same class
 
         self.name = name
         self.start()
 
-    def __q(self, item_dict: dict):
-        logger.debug(item_dict)
-        self._q.put(item_dict)
+    def __q(self, item: tuple):
+        logger.debug(item)
+        self._q.put(item)
 
     def shutdown(self):
-        item_dict = {"type": self.EVENT_SHUTDOWN, "from": "shutdown"}
-        self.__q(item_dict)
+        self.__q((self.EVENT_SHUTDOWN, None))
         self.join()
 
     def is_stopped(self):
         return self._stop_event.is_set()
 
-    def _event_shutdown(self):
+    def _event_shutdown(self, payload=None):
         self._stop_event.set()
         logger.info(f"{self.name} shutdown")
 
@@ -59,44 +69,44 @@ class Worker(Thread):
     # For any GUI event, do the work on this class's thread, leaving
     # the DPG thread to run as fast as possible
 
-    def _event_button1(self, item: dict):
+    def _event_button1(self, payload: dict):
         # this is now running on its own thread
-        logger.info(item)
+        logger.info(payload)
+
+    def _timer_status(self):
+        # this is running on this thread too, every 10 seconds
+        logger.info(f"{self.name} alive")
 
     def cb_button1(self, sender, app_data, user_data):
         logger.info(f"sender: {sender} {app_data} {user_data}")
-        item_dict = {"type": self.EVENT_CB_BUTTON1,
-                     "cb": dict(s=sender, a=app_data, u=user_data),
-                     "from": "cb_button1"}
-        self.__q(item_dict)
+        self.__q((self.EVENT_CB_BUTTON1, dict(s=sender, a=app_data, u=user_data)))
 
     def run(self):
         logger.info(f"{self.name} run thread started")
         while not self.is_stopped():
 
+            event_type = None
             try:
-                item = self._q.get(block=True)
-                logger.debug(item)
+                event_type, payload = self._q.get(block=True, timeout=self._sched.timeout())
+                logger.debug(event_type)
 
+                # ------------- Add your handlers to self._handlers --------------------
+                handler = self._handlers.get(event_type)
                 with self._lock:
-                    if item["type"] == self.EVENT_SHUTDOWN:
-                        self._event_shutdown()
-
-                    # ------------- Your specific code goes here --------------------
-
-                    elif item["type"] == self.EVENT_CB_BUTTON1:
-                        self._event_button1(item)
+                    if handler is not None:
+                        handler(payload)
 
                     else:
-                        logger.error("Unknown event: {}".format(item["type"]))
+                        logger.error("Unknown event: {}".format(event_type))
 
             except queue.Empty:
                 pass
             except Exception as e:
-                logger.error("Error processing event {}, {}".format(e, item["type"]))
+                logger.error("Error processing event {}, {}".format(e, event_type))
                 traceback.print_exc()
 
-            time.sleep(0)  # allow other threads to run if any, in the case that the queue is full
+            with self._lock:
+                self._sched.run_due()
 
         logger.info(f"{self.name} run thread stopped")
 
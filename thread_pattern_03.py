@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Martin Guthrie
+
+This code pattern demonstrates an asyncio worker, GUI callback events
+and asyncio device sessions share the worker's event loop.
+
+"""
+import dearpygui.dearpygui as dpg
+from worker_klass import AsyncWorkerBase, handles
+import asyncio
+import logging
+logger = logging.getLogger()
+FORMAT = "%(asctime)s: %(threadName)10s %(filename)22s %(funcName)25s %(levelname)-5.5s :%(lineno)4s: %(message)s"
+formatter = logging.Formatter(FORMAT)
+consoleHandler = logging.StreamHandler()
+consoleHandler.setFormatter(formatter)
+logger.addHandler(consoleHandler)
+logger.setLevel(logging.INFO)
+
+
+class Worker(AsyncWorkerBase):
+
+    EVENT_CB_BUTTON1 = "EVENT_CB_BUTTON1"
+    EVENT_READING = "EVENT_READING"
+
+    def __init__(self, name="Worker"):
+        super().__init__(name)
+        self._readings = {}
+
+    # ------------- Your specific code goes here --------------------
+    # For any GUI event, do the work on this class's thread, leaving
+    # the DPG thread to run as fast as possible
+
+    @handles(EVENT_CB_BUTTON1)
+    async def _event_button1(self, item: dict):
+        # this is running on the worker's event loop
+        logger.info(f"{item}, readings {self._readings}")
+
+    @handles(EVENT_READING)
+    async def _event_reading(self, item: dict):
+        self._readings[item["device"]] = item["value"]
+        return len(self._readings)  # the result of request()
+
+    def cb_button1(self, sender, app_data, user_data):
+        # this is called on the client thread, in this case the DPG thread
+        logger.info(f"sender: {sender} {app_data} {user_data}")
+        item_dict = {"type": self.EVENT_CB_BUTTON1,
+                     "cb": dict(s=sender, a=app_data, u=user_data),
+                     "from": "cb_button1"}
+        self.enqueue_threadsafe(item_dict)
+
+    async def device_session(self, device):
+        # simulated device driver, runs on the worker's event loop
+        value = 0
+        while True:
+            await asyncio.sleep(1.0)
+            value += 1
+            n = await self.request({"type": self.EVENT_READING, "device": device, "value": value})
+            logger.debug(f"{device} {value}, {n} devices")
+
+
+dpg.create_context()
+dpg.create_viewport(height=200, width=200)
+dpg.setup_dearpygui()
+
+worker = Worker()
+for d in range(100):
+    worker.submit(worker.device_session(f"dev{d}"))
+
+with dpg.window(label="Example", height=100, width=100):
+    dpg.add_text("Hello world")
+
+    # NOTE: the callback happens on the worker thread
+    dpg.add_button(tag="b1", label="Button1", callback=worker.cb_button1)
+
+dpg.show_viewport()
+dpg.start_dearpygui()
+
+# shut thread down properly, the device sessions are cancelled
+worker.shutdown()
+
+dpg.destroy_context()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Martin Guthrie
+
+This code pattern demonstrates a pooled worker, GUI callback events
+for different widgets are handled in parallel, events for the same widget
+are handled in order.
+
+"""
+import dearpygui.dearpygui as dpg
+from worker_klass import PoolWorkerBase, WorkerEvent, handles
+from threading import Lock
+import time
+import logging
+logger = logging.getLogger()
+FORMAT = "%(asctime)s: %(threadName)10s %(filename)22s %(funcName)25s %(levelname)-5.5s :%(lineno)4s: %(message)s"
+formatter = logging.Formatter(FORMAT)
+consoleHandler = logging.StreamHandler()
+consoleHandler.setFormatter(formatter)
+logger.addHandler(consoleHandler)
+logger.setLevel(logging.INFO)
+
+
+class Worker(PoolWorkerBase):
+
+    EVENT_CB_BUTTON = "EVENT_CB_BUTTON"
+
+    def __init__(self, name="Worker"):
+        super().__init__(name, max_workers=4)
+        self._lock = Lock()  # handlers for different buttons run at the same time
+        self._clicks = {}
+
+    # ------------- Your specific code goes here --------------------
+    # For any GUI event, do the work on the pool threads, leaving
+    # the DPG thread to run as fast as possible
+
+    @handles(EVENT_CB_BUTTON)
+    def _event_button(self, item: WorkerEvent):
+        # this is running on a pool thread, a slow button only delays itself
+        time.sleep(2.0)
+        with self._lock:
+            self._clicks[item.key] = self._clicks.get(item.key, 0) + 1
+            logger.info(f"{item.key} done, clicks {self._clicks}")
+
+    def cb_button(self, sender, app_data, user_data):
+        # this is called on the client thread, in this case the DPG thread
+        logger.info(f"sender: {sender} {app_data} {user_data}")
+        self.enqueue(WorkerEvent(self.EVENT_CB_BUTTON,
+                                 dict(s=sender, a=app_data, u=user_data),
+                                 key=sender))  # the ordering key
+
+
+dpg.create_context()
+dpg.create_viewport(height=200, width=200)
+dpg.setup_dearpygui()
+
+worker = Worker()
+
+with dpg.window(label="Example", height=150, width=150):
+    dpg.add_text("Hello world")
+
+    # NOTE: the callbacks happen on the pool threads
+    dpg.add_button(tag="b1", label="Button1", callback=worker.cb_button)
+    dpg.add_button(tag="b2", label="Button2", callback=worker.cb_button)
+    dpg.add_button(tag="b3", label="Button3", callback=worker.cb_button)
+
+dpg.show_viewport()
+dpg.start_dearpygui()
+
+# shut the pool down properly
+worker.shutdown()
+
+dpg.destroy_context()
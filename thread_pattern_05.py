@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Martin Guthrie
+
+This code pattern demonstrates offloading a CPU bound GUI event handler
+to a process pool, the captured data is passed through shared memory.
+
+NOTE: the pool processes import this file, so the GUI is only started
+      under if __name__ == "__main__":
+
+"""
+import dearpygui.dearpygui as dpg
+from worker_klass import WorkerBase, handles
+import array
+import random
+import logging
+logger = logging.getLogger()
+
+
+def capture_stats(data, item):
+    # runs in a pool process, data is a view of the shared memory
+    lo, hi, total = data[0], data[0], 0.0
+    for v in data:
+        if v < lo: lo = v
+        if v > hi: hi = v
+        total += v
+    return lo, total / len(data), hi
+
+
+class Worker(WorkerBase):
+
+    EVENT_CB_BUTTON1 = "EVENT_CB_BUTTON1"
+    EVENT_STATS = "EVENT_STATS"
+    EVENT_STATS_DONE = "EVENT_STATS_DONE"
+
+    OFFLOAD = {EVENT_STATS: (capture_stats, EVENT_STATS_DONE)}
+
+    def __init__(self, name="Worker"):
+        super().__init__(name)
+
+    # ------------- Your specific code goes here --------------------
+    # For any GUI event, do the work on this class's thread, leaving
+    # the DPG thread to run as fast as possible
+
+    @handles(EVENT_CB_BUTTON1)
+    def _event_button1(self, item: dict):
+        # simulate a capture, and hand the number crunching to the pool
+        data = array.array("d", (random.gauss(10.0, 2.0) for _ in range(2_000_000)))
+        self.enqueue({"type": self.EVENT_STATS, "data": data, "from": "_event_button1"})
+
+    @handles(EVENT_STATS_DONE)
+    def _event_stats_done(self, item: dict):
+        if item["error"]:
+            logger.error(item["error"])
+            return
+
+        lo, avg, hi = item["result"]
+        dpg.set_value("stats", f"min {lo:.3f}, avg {avg:.3f}, max {hi:.3f}")
+
+    def cb_button1(self, sender, app_data, user_data):
+        # this is called on the client thread, in this case the DPG thread
+        logger.info(f"sender: {sender} {app_data} {user_data}")
+        item_dict = {"type": self.EVENT_CB_BUTTON1,
+                     "cb": dict(s=sender, a=app_data, u=user_data),
+                     "from": "cb_button1"}
+        self.enqueue(item_dict)
+
+
+if __name__ == "__main__":
+    FORMAT = "%(asctime)s: %(threadName)10s %(filename)22s %(funcName)25s %(levelname)-5.5s :%(lineno)4s: %(message)s"
+    formatter = logging.Formatter(FORMAT)
+    consoleHandler = logging.StreamHandler()
+    consoleHandler.setFormatter(formatter)
+    logger.addHandler(consoleHandler)
+    logger.setLevel(logging.INFO)
+
+    dpg.create_context()
+    dpg.create_viewport(height=200, width=400)
+    dpg.setup_dearpygui()
+
+    worker = Worker()
+
+    with dpg.window(label="Example", height=100, width=350):
+        dpg.add_text("", tag="stats")
+
+        # NOTE: the stats are computed in a pool process
+        dpg.add_button(tag="b1", label="Capture", callback=worker.cb_button1)
+
+    dpg.show_viewport()
+    dpg.start_dearpygui()
+
+    # shut thread down properly
+    worker.shutdown()
+
+    dpg.destroy_context()
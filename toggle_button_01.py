@@ -7,6 +7,7 @@ This code pattern demonstrates a toggle button with theme
 """
 import os
 import dearpygui.dearpygui as dpg
+from theme_klass import Themes
 import logging
 logger = logging.getLogger()
 FORMAT = "%(asctime)s: %(filename)22s %(funcName)25s %(levelname)-5.5s :%(lineno)4s: %(message)s"
@@ -17,45 +18,81 @@ logger.addHandler(consoleHandler)
 logger.setLevel(logging.INFO)
 
 
-dpg.create_context()
-dpg.create_viewport(height=200, width=200)
-dpg.setup_dearpygui()
+# nothing is created in DPG when this file is imported, the ID uuids are
+# created by the first ids() call, in the app's context, fonts and themes
+# the first time they are used, see Fonts and Themes
 
 
 class ID:
     """  All DPG IDs are created here
+    - name(id) is a dict lookup, a reverse index of ID is kept, add ids with
+      add_object() or add_objects() so the index is updated
+    - get("button.run") looks an id up by its namespaced name
+    - the uuids are generated when ID is created, a DPG context is needed
+
     """
 
-    ID = {
+    def __init__(self):
+        self.ID = {
 
-        # other IDs would be listed here
+            # other IDs would be listed here
 
-        "button": {
-            "run": dpg.generate_uuid(),  # actually a ToggleButton
-        },
-        "theme": {
-            "togglebutton_run_enabled": dpg.generate_uuid(),
-            "togglebutton_run_active": dpg.generate_uuid(),
-            "togglebutton_run_disabled": dpg.generate_uuid(),
-        },
-        "obj_ToggleButton": {
-            # dynamically added
+            "button": {
+                "run": dpg.generate_uuid(),  # actually a ToggleButton
+            },
+            "theme": {
+                # added by ToggleButton
+            },
+            "obj_ToggleButton": {
+                # dynamically added
+            }
         }
-    }
+
+        self._names = {}  # id -> "obj.key", the first name of an id wins
+        for obj, ids in self.ID.items():
+            for key, value in ids.items():
+                self._names.setdefault(value, f"{obj}.{key}")
 
     def add_object(self, obj, key, value):
         if obj not in self.ID:
             raise ValueError(f"{obj} not in ID")
 
+        name = f"{obj}.{key}"
+        old = self.ID[obj].get(key)
+        if old is not None and self._names.get(old) == name:
+            del self._names[old]
+
         self.ID[obj][key] = value
+        self._names.setdefault(value, name)
+
+    def add_objects(self, obj, keys, create=False):
+        """ Add a family of ids, ie the buttons of a panel
+
+        :param obj: category, ie "button"
+        :param keys: {key: id}, or a list of keys, a uuid is generated for each key
+        :param create: create the category if it is not in ID
+        :return: {key: id} of the added ids
+        """
+        if create:
+            self.ID.setdefault(obj, {})
+
+        if not isinstance(keys, dict):
+            keys = {key: dpg.generate_uuid() for key in keys}
+
+        for key, value in keys.items():
+            self.add_object(obj, key, value)
+        return keys
+
+    def get(self, name):
+        """ id of a namespaced name, ie "button.run", raises KeyError if not found """
+        obj, _, key = name.partition(".")
+        try:
+            return self.ID[obj][key]
+        except KeyError:
+            raise KeyError(name) from None
 
     def name(self, id):
-        for key in self.ID:
-            for kkey in self.ID[key]:
-                if self.ID[key][kkey] == id:
-                    return f"{key}.{kkey}"
-
-        return f"not.found_{id}"
+        return self._names.get(id) or f"not.found_{id}"
 
     def show_all(self):
         for key in self.ID:
@@ -63,56 +100,86 @@ class ID:
                 logger.info(f"{key}.{kkey} {self.ID[key][kkey]}")
 
 
-id = ID()
+id = None  # see ids()
+
+
+def ids():
+    """ the ID of the app, created by the first call, after dpg.create_context() """
+    global id
+    if id is None:
+        id = ID()
+    return id
 
 
 class Fonts(object):
+    """ Fonts are loaded the first time they are asked for, see get()
+    - the class attributes are font sizes, ie Fonts.get(Fonts.run)
+    - a font is loaded once per (file, size), all the users share it
+
+    """
 
     # fancy path stuff supports Nuitka builds
     f = os.path.join(os.path.dirname(__file__), "assets/UbuntuMono-BI.ttf")
 
-    with dpg.font_registry():
-        default_big = dpg.add_font(f, 30)
-        default = dpg.add_font(f, 15)
-        default_small = dpg.add_font(f, 12)
+    default_big = 30
+    default = 15
+    default_small = 12
+
+    run = 24
+
+    _fonts = {}  # (file, size) -> font
+    _registry = None
+
+    @classmethod
+    def get(cls, size, file=None):
+        """ Font of size from file, default Fonts.f, loaded on the first call
+
+        :param size: font size
+        :param file: font file
+        :return: DPG font
+        """
+        key = (file or cls.f, size)
+        font = cls._fonts.get(key)
+        if font is None:
+            if cls._registry is None:
+                cls._registry = dpg.add_font_registry()
+            font = cls._fonts[key] = dpg.add_font(key[0], size, parent=cls._registry)
+        return font
 
-        run = dpg.add_font(f, 24)
+    @classmethod
+    def clear(cls):
+        """ forget the loaded fonts, call after dpg.destroy_context() """
+        cls._fonts = {}
+        cls._registry = None
 
 
 class ThemeToggleRun(object):
     """ Theme for Toggle Buttons
     - used by Run, Single, and Connect
+    - the themes are specs, see theme_klass.Themes, built when the first
+      button uses them, and shared by all the buttons
 
     """
 
     name = "run"
 
-    with dpg.theme(tag=id.ID["theme"][f"togglebutton_{name}_enabled"]):  # not active
-        with dpg.theme_component(dpg.mvButton):
-            dpg.add_theme_color(dpg.mvThemeCol_Button, (66, 245, 126))
-            dpg.add_theme_color(dpg.mvThemeCol_ButtonActive, (160, 240, 144))
-            dpg.add_theme_color(dpg.mvThemeCol_ButtonHovered, (160, 240, 144))
-            dpg.add_theme_style(dpg.mvStyleVar_FrameRounding, 15)
-            dpg.add_theme_style(dpg.mvStyleVar_FramePadding, 9, 9)
-            dpg.add_theme_color(dpg.mvThemeCol_Text, (34, 27, 227))
-
-    with dpg.theme(tag=id.ID["theme"][f"togglebutton_{name}_active"]):  # shows STOP, and red for stop
-        with dpg.theme_component(dpg.mvButton):
-            dpg.add_theme_color(dpg.mvThemeCol_Button, (245, 159, 159))
-            dpg.add_theme_color(dpg.mvThemeCol_ButtonActive, (245, 159, 159))
-            dpg.add_theme_color(dpg.mvThemeCol_ButtonHovered, (245, 159, 159))
-            dpg.add_theme_style(dpg.mvStyleVar_FrameRounding, 15)
-            dpg.add_theme_style(dpg.mvStyleVar_FramePadding, 9, 9)
-
-    with dpg.theme(tag=id.ID["theme"][f"togglebutton_{name}_disabled"]):
-        with dpg.theme_component(dpg.mvButton):
-            dpg.add_theme_color(dpg.mvThemeCol_Button, (161, 168, 160))
-            dpg.add_theme_color(dpg.mvThemeCol_ButtonActive, (161, 168, 160))
-            dpg.add_theme_color(dpg.mvThemeCol_ButtonHovered, (161, 168, 160))
-            dpg.add_theme_style(dpg.mvStyleVar_FrameRounding, 15)
-            dpg.add_theme_style(dpg.mvStyleVar_FramePadding, 9, 9)
-
-    font_enabled = Fonts.run
+    _style = ((Themes.STYLE, dpg.mvStyleVar_FrameRounding, 15),
+              (Themes.STYLE, dpg.mvStyleVar_FramePadding, 9, 9))
+
+    enabled = ((dpg.mvButton, ((Themes.COLOR, dpg.mvThemeCol_Button, (66, 245, 126)),  # not active
+                               (Themes.COLOR, dpg.mvThemeCol_ButtonActive, (160, 240, 144)),
+                               (Themes.COLOR, dpg.mvThemeCol_ButtonHovered, (160, 240, 144)),
+                               (Themes.COLOR, dpg.mvThemeCol_Text, (34, 27, 227))) + _style),)
+
+    active = ((dpg.mvButton, ((Themes.COLOR, dpg.mvThemeCol_Button, (245, 159, 159)),  # shows STOP, and red for stop
+                              (Themes.COLOR, dpg.mvThemeCol_ButtonActive, (245, 159, 159)),
+                              (Themes.COLOR, dpg.mvThemeCol_ButtonHovered, (245, 159, 159))) + _style),)
+
+    disabled = ((dpg.mvButton, ((Themes.COLOR, dpg.mvThemeCol_Button, (161, 168, 160)),
+                                (Themes.COLOR, dpg.mvThemeCol_ButtonActive, (161, 168, 160)),
+                                (Themes.COLOR, dpg.mvThemeCol_ButtonHovered, (161, 168, 160))) + _style),)
+
+    font_enabled = Fonts.run  # font sizes, see Fonts.get()
     font_disabled = Fonts.run
     font_active = Fonts.run
 
@@ -125,26 +192,27 @@ class ToggleButton(object):
 
     def __init__(self, name, themeKlass, **kwargs):
 
-        if name not in id.ID["button"]:
+        if name not in ids().ID["button"]:
             raise ValueError("{} not in ids".format(name))
 
-        kwargs["tag"] = self._tag = id.ID["button"][name]
+        kwargs["tag"] = self._tag = ids().ID["button"][name]
 
         self._state = kwargs.get("state", self.STATE_ENABLED)
         self._cb = kwargs.get("callback", None)
 
+        # themes and fonts are created by the first button that uses them
         self._attrb = {
             self.STATE_ENABLED: {
-                "theme": id.ID["theme"]["togglebutton_{}_enabled".format(themeKlass.name)],
-                "font": themeKlass.font_enabled
+                "theme": self._theme(themeKlass.enabled, "togglebutton_{}_enabled".format(themeKlass.name)),
+                "font": Fonts.get(themeKlass.font_enabled)
             },
             self.STATE_DISABLED: {
-                "theme": id.ID["theme"]["togglebutton_{}_disabled".format(themeKlass.name)],
-                "font": themeKlass.font_disabled
+                "theme": self._theme(themeKlass.disabled, "togglebutton_{}_disabled".format(themeKlass.name)),
+                "font": Fonts.get(themeKlass.font_disabled)
             },
             self.STATE_ACTIVE: {
-                "theme": id.ID["theme"]["togglebutton_{}_active".format(themeKlass.name)],
-                "font": themeKlass.font_active
+                "theme": self._theme(themeKlass.active, "togglebutton_{}_active".format(themeKlass.name)),
+                "font": Fonts.get(themeKlass.font_active)
             },
         }
 
@@ -163,6 +231,12 @@ class ToggleButton(object):
         dpg.add_button(**kwargs)
         self.set_state()
 
+    @staticmethod
+    def _theme(spec, name):
+        theme = Themes.get(spec)
+        ids().add_object("theme", name, theme)
+        return theme
+
     def __cb(self, sender, app_data, user_data):
         if self._state == self.STATE_ENABLED:
             self.set_state(self.STATE_ACTIVE)
@@ -197,22 +271,29 @@ class ToggleButton(object):
         return self._tag
 
 
-def cb_button1(sender, app_data, user_data):
-    logger.info(f"B1 sender: {sender} {app_data} {user_data}")
-    logger.info(f"   state : {user_data.get_state()}")
+if __name__ == "__main__":
 
+    def cb_button1(sender, app_data, user_data):
+        logger.info(f"B1 sender: {sender} {app_data} {user_data}")
+        logger.info(f"   state : {user_data.get_state()}")
 
-with dpg.window(label="Example", height=100, width=150):
-    dpg.add_text("Hello world")
+    dpg.create_context()
+    dpg.create_viewport(height=200, width=200)
+    dpg.setup_dearpygui()
 
-    _run = ToggleButton(name="run",
-                        themeKlass=ThemeToggleRun,
-                        label=["RUN", "STOP", "RUN"],
-                        width=100,
-                        callback=cb_button1)
+    with dpg.window(label="Example", height=100, width=150):
+        dpg.add_text("Hello world")
 
-dpg.show_viewport()
-dpg.start_dearpygui()
-dpg.destroy_context()
+        _run = ToggleButton(name="run",
+                            themeKlass=ThemeToggleRun,
+                            label=["RUN", "STOP", "RUN"],
+                            width=100,
+                            callback=cb_button1)
 
+        # one call swaps every palette color, see Themes.use_palette()
+        dpg.add_checkbox(label="Light", callback=lambda s, a, u: Themes.use_palette(
+            Themes.PALETTE_LIGHT if a else Themes.PALETTE_DARK))
 
+    dpg.show_viewport()
+    dpg.start_dearpygui()
+    dpg.destroy_context()
@@ -0,0 +1,877 @@
+# -*- coding: utf-8 -*-
+"""
+Martin Guthrie
+
+Worker base classes, GUI callback events are handled on the worker's
+own thread(s), see thread_pattern_02.py .. thread_pattern_05.py
+
+"""
+from threading import Thread, Lock, Event
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import deque
+from itertools import count
+from multiprocessing import shared_memory, get_context
+from logger_shm import shm_attach
+from worker_metrics import WorkerMetrics
+import asyncio
+import heapq
+import queue
+import time
+import traceback
+import logging
+logger = logging.getLogger()
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def handles(*event_types):
+    """ Decorator, registers a worker method as the handler of event_types
+
+        @handles(EVENT_CB_BUTTON1)
+        def _event_button1(self, item):
+            ...
+
+    """
+    def decorator(fn):
+        fn.handles = event_types
+        return fn
+    return decorator
+
+
+def _register_handlers(cls):
+    """ Fill cls._HANDLERS, event type -> method name, from the base class
+    table and the @handles methods of cls, called once per class when it is
+    created (__init_subclass__), the names are bound per instance
+    """
+    handlers = dict(cls._HANDLERS)
+    for name, fn in vars(cls).items():
+        for event_type in getattr(fn, "handles", ()):
+            handlers[event_type] = name
+    cls._HANDLERS = handlers
+
+
+class WorkerEvent(object):
+    """ Event, lighter than an event dict, no per event dict is allocated
+    - type, the event type
+    - data, anything the handler needs, ie dict(s=sender, a=app_data, u=user_data)
+    - key, ordering key for PoolWorkerBase
+    - event["type"] and event.get("key") work too, like an event dict
+
+    """
+    __slots__ = ("type", "data", "key")
+
+    def __init__(self, type, data=None, key=None):
+        self.type = type
+        self.data = data
+        self.key = key
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __repr__(self):
+        return f"WorkerEvent({self.type!r}, {self.data!r}, {self.key!r})"
+
+
+def _offload_payload(data):
+    """ Copy an offload payload into a new shared memory block
+
+    :param data: numpy array, or any buffer, ie bytes, array.array, memoryview
+    :return: SharedMemory, payload description for _offload_call
+    """
+    if np is not None and isinstance(data, np.ndarray):
+        shm = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+        np.ndarray(data.shape, data.dtype, buffer=shm.buf)[...] = data
+        return shm, ("numpy", data.shape, data.dtype.str, data.nbytes)
+
+    view = memoryview(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, view.nbytes))
+    shm.buf[:view.nbytes] = view.cast("B")
+    return shm, ("buffer", None, view.format, view.nbytes)
+
+
+def _offload_call(fn, shm_name, payload, item):
+    """ Runs in a pool process, maps the payload and returns fn(data, item) """
+    shm = shm_attach(shm_name)
+    kind, shape, fmt, nbytes = payload
+    if kind == "numpy":
+        data = np.ndarray(shape, fmt, buffer=shm.buf)
+    else:
+        data = shm.buf[:nbytes].cast(fmt)
+
+    try:
+        return fn(data, item)
+    finally:
+        if kind != "numpy":
+            data.release()
+        del data
+        try:
+            shm.close()
+        except BufferError:  # fn kept a view of the data, the mapping goes with the process
+            pass
+
+
+class ScheduledCall(object):
+    """ A Scheduler timer, cancel() stops it """
+    __slots__ = ("when", "fn", "args", "period", "cancelled")
+
+    def __init__(self, when, fn, args, period):
+        self.when = when
+        self.fn = fn
+        self.args = args
+        self.period = period
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler(object):
+    """ Timers for a worker thread, that already waits on a queue
+    - call_at(), call_later(), call_every() are thread safe, the calls are
+      run on the worker thread by run_due()
+    - the worker waits on its queue with timeout(), so one wait covers
+      both queued events and timers, no timer threads
+    - wake() is called when a new timer is due before the others, it must
+      queue an entry that wakes the worker, so the wait is recomputed
+    - a periodic call that falls behind skips the missed periods
+
+    """
+
+    def __init__(self, wake):
+        self._heap = []  # (when, seq, ScheduledCall)
+        self._lock = Lock()
+        self._seq = count()
+        self._wake = wake
+
+    def call_at(self, when, fn, *args, period=None):
+        """ Call fn(*args) at time.monotonic() when, and every period seconds after that if period
+
+        :return: ScheduledCall
+        """
+        call = ScheduledCall(when, fn, args, period)
+        with self._lock:
+            earliest = not self._heap or when < self._heap[0][0]
+            heapq.heappush(self._heap, (when, next(self._seq), call))
+
+        if earliest:
+            self._wake()
+        return call
+
+    def call_later(self, delay, fn, *args):
+        return self.call_at(time.monotonic() + delay, fn, *args)
+
+    def call_every(self, period, fn, *args, delay=None):
+        """ Call fn(*args) every period seconds, the first call is after delay, default period """
+        return self.call_at(time.monotonic() + (period if delay is None else delay), fn, *args, period=period)
+
+    def timeout(self):
+        """ seconds until the next timer is due, None if there are none """
+        if not self._heap:
+            return None
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def run_due(self):
+        """ Run the calls that are due, call from the worker thread """
+        if not self._heap:
+            return
+
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                due.append(heapq.heappop(heap)[2])
+
+        for call in due:
+            if call.cancelled:
+                continue
+
+            try:
+                call.fn(*call.args)
+            except Exception as e:
+                logger.error("Error in scheduled call {}, {}".format(call.fn, e))
+                traceback.print_exc()
+
+            if call.period and not call.cancelled:
+                call.when += call.period
+                if call.when <= now:
+                    call.when = now + call.period
+                with self._lock:
+                    heapq.heappush(self._heap, (call.when, next(self._seq), call))
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+
+class LaneQueue(queue.Queue):
+    """ Priority queue of named lanes
+    - lanes, ((name, maxsize, weight), ...), highest priority first, maxsize
+      bounds the lane (0 is unbounded), put() blocks while the item's lane is full
+    - lane_of(item) returns the lane name of an item
+    - lanes are served in priority order, weighted round robin, a lane is
+      served weight items before the lower lanes get a turn, so a busy
+      high lane can't starve the lower ones forever
+    - metrics, a WorkerMetrics, records the depth and the time each item waited
+
+    """
+
+    def __init__(self, lanes, lane_of, metrics=None):
+        self._lane_names = {name: i for i, (name, _, _) in enumerate(lanes)}
+        self._lane_maxsizes = [maxsize for _, maxsize, _ in lanes]
+        self._lane_weights = [max(1, weight) for _, _, weight in lanes]
+        self._lane_of = lane_of
+        self._metrics = metrics
+        super().__init__()
+
+    def _init(self, maxsize):
+        self.lanes = [deque() for _ in self._lane_weights]
+        self._credits = list(self._lane_weights)
+        # enqueue times, parallel to lanes
+        self._times = [deque() for _ in self._lane_weights] if self._metrics is not None else None
+
+    def _qsize(self):
+        return sum(map(len, self.lanes))
+
+    def _put(self, item):
+        self._append(self._lane_names[self._lane_of(item)], item)
+
+    def _append(self, i, item):
+        self.lanes[i].append(item)
+        if self._times is not None:
+            self._times[i].append(time.perf_counter())
+            self._metrics.queued(self._qsize())
+
+    def _get(self):
+        for _ in range(2):
+            for i, lane in enumerate(self.lanes):
+                if lane and self._credits[i]:
+                    self._credits[i] -= 1
+                    if self._lane_maxsizes[i]:
+                        self.not_full.notify_all()  # the waiters are for different lanes
+                    if self._times is not None:
+                        self._metrics.dequeued(time.perf_counter() - self._times[i].popleft(), self._qsize() - 1)
+                    return lane.popleft()
+
+            self._credits = list(self._lane_weights)
+
+    def put(self, item, block=True, timeout=None):
+        i = self._lane_names[self._lane_of(item)]
+        with self.not_full:
+            maxsize = self._lane_maxsizes[i]
+            if maxsize > 0:
+                lane = self.lanes[i]
+                if not block:
+                    if len(lane) >= maxsize:
+                        raise queue.Full
+                elif timeout is None:
+                    while len(lane) >= maxsize:
+                        self.not_full.wait()
+                else:
+                    endtime = time.monotonic() + timeout
+                    while len(lane) >= maxsize:
+                        remaining = endtime - time.monotonic()
+                        if remaining <= 0.0:
+                            raise queue.Full
+                        self.not_full.wait(remaining)
+
+            self._append(i, item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def put_unbounded(self, item):
+        """ put() that ignores the lane maxsize and never blocks, for control
+        entries, ie the scheduler wake, which may be put by the worker thread
+        itself and would deadlock it on a full lane
+        """
+        i = self._lane_names[self._lane_of(item)]
+        with self.not_full:
+            self._append(i, item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+class _Coalesced(object):
+    """ queue entry of a COALESCE_LATEST event, item is replaced by newer events """
+    __slots__ = ("ckey", "item")
+
+    def __init__(self, ckey, item):
+        self.ckey = ckey
+        self.item = item
+
+
+_WAKE = object()  # queue entry that only wakes the run loop
+
+
+class WorkerBase(Thread):
+    """ Handles queued events on its own thread, one at a time, under self._lock
+    - events are dicts with a "type" key, or WorkerEvent
+    - handlers are methods registered with @handles(event type), dispatch is
+      one dict lookup, events without a handler go to subc_events(item),
+      which returns True if the event was handled
+
+    Offload, CPU bound handlers can be run in a process pool, out of reach of
+    the GIL, so they don't slow the DPG thread,
+    - OFFLOAD maps an event type to (function, done event type), the function
+      is called in a pool process as function(data, item), it must be a module
+      level function, and the module must not start the GUI when it is imported
+      (use if __name__ == "__main__":)
+    - item["data"] is the payload, a numpy array or a buffer (bytes, array.array),
+      it is copied once into shared memory, the function gets a numpy array, or a
+      memoryview, of the shared memory, valid only during the call.  The rest of
+      item is pickled, keep it small.
+    - when the function returns, {"type": done event type, "item": item without data,
+      "result": result, "error": exception or None} is queued and handled as usual
+    - max_processes is the pool size, default the number of cpus, the pool is
+      created on the first offloaded event
+
+    Coalescing, for bursty events like slider and drag callbacks where only
+    the latest value matters, COALESCE maps an event type to a policy,
+        (COALESCE_LATEST, None), a queued event is replaced by a newer one,
+                                 it is handled at the queue position of the first
+        (COALESCE_DEBOUNCE, ms), handled ms after the last event of a burst
+        (COALESCE_THROTTLE, hz), handled at most hz times per second, the
+                                 latest event in each period is handled
+    - events are coalesced per (type, key), key is item["key"] (or WorkerEvent.key)
+      so events from different widgets are not merged
+    - superseded events are counted in self.coalesced
+    - set_coalesce() changes the policy of an event type at run time
+
+    Lanes, the queue is a LaneQueue, see LANES, urgent events are handled
+    before queued bulk work,
+    - EVENT_LANES maps an event type to a lane name, other events go to
+      DEFAULT_LANE, override lane() to choose per event
+    - EVENT_SHUTDOWN always goes to the top lane, events still queued in the
+      lower lanes are not handled
+
+    Timers, call_later(), call_every() and enqueue_later() run on the worker
+    thread, under self._lock, the worker waits for events and timers with one
+    queue wait, see Scheduler, ie periodic GUI refreshes without Timer threads.
+
+    Metrics, with metrics=True self.metrics is a WorkerMetrics, the queue depth,
+    the time events wait in the queue and the handler time per event type are
+    recorded, see worker_metrics.metrics_window() to show them in DPG.
+
+    """
+
+    EVENT_SHUTDOWN = "EVENT_SHUTDOWN"
+
+    OFFLOAD = {}  # event type -> (function, done event type)
+
+    COALESCE_LATEST = "latest"
+    COALESCE_DEBOUNCE = "debounce"
+    COALESCE_THROTTLE = "throttle"
+
+    COALESCE = {}  # event type -> (COALESCE_*, value)
+
+    LANE_CONTROL = "control"
+    LANE_INTERACTIVE = "interactive"
+    LANE_BULK = "bulk"
+
+    # (name, maxsize, weight), highest priority first, see LaneQueue
+    LANES = ((LANE_CONTROL, 0, 16),
+             (LANE_INTERACTIVE, 0, 4),
+             (LANE_BULK, 0, 1))
+
+    EVENT_LANES = {}  # event type -> lane name
+    DEFAULT_LANE = LANE_INTERACTIVE
+
+    _HANDLERS = {EVENT_SHUTDOWN: "_event_shutdown"}  # event type -> method name, see @handles
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _register_handlers(cls)
+
+    def __init__(self, name="Worker", max_processes=None, metrics=False):
+        super().__init__()
+
+        self._lock = Lock()
+        self._top_lane = self.LANES[0][0]
+        self.metrics = WorkerMetrics() if metrics else None
+        self._q = LaneQueue(self.LANES, self._lane_of, self.metrics)
+        self._stop_event = Event()
+        self._handlers = {t: getattr(self, n) for t, n in self._HANDLERS.items()}
+        self._max_processes = max_processes
+        self._process_pool = None
+        self._sched = Scheduler(lambda: self._q.put_unbounded(_WAKE))
+
+        self._coalesce = dict(self.COALESCE)
+        self._coalesce_lock = Lock()
+        self._latest = {}         # (type, key) -> queued _Coalesced
+        self._delayed = {}        # (type, key) -> [due time, item, policy], debounced or throttled,
+                                  # a scheduler timer is pending for each
+        self._throttle_last = {}  # (type, key) -> time the last throttled event was handled
+        self.coalesced = 0        # number of superseded events
+
+        # Note: you can create your dpg widgets here, create the widgets
+        #       and put the callbacks in the same class
+
+        self.name = name
+        self.start()
+
+    def enqueue(self, item_dict: dict):
+        logger.debug(item_dict)
+        if self._coalesce:
+            event_type = item_dict.type if item_dict.__class__ is WorkerEvent else item_dict["type"]
+            policy = self._coalesce.get(event_type)
+            if policy is not None:
+                self._enqueue_coalesced(item_dict, (event_type, item_dict.get("key")), *policy)
+                return
+
+        self._q.put(item_dict)
+
+    def lane(self, item):
+        """ lane name of an event, override to choose the lane per event """
+        return self.EVENT_LANES.get(item.type if item.__class__ is WorkerEvent else item["type"], self.DEFAULT_LANE)
+
+    def _lane_of(self, item):
+        if item is _WAKE:
+            return self._top_lane
+        if item.__class__ is _Coalesced:
+            item = item.item
+        if (item.type if item.__class__ is WorkerEvent else item["type"]) == self.EVENT_SHUTDOWN:
+            return self._top_lane
+        return self.lane(item)
+
+    def set_coalesce(self, event_type, policy, value=None):
+        """ Coalesce events of event_type
+
+        :param event_type: event type
+        :param policy: COALESCE_LATEST, COALESCE_DEBOUNCE, COALESCE_THROTTLE, or None to stop coalescing
+        :param value: ms for COALESCE_DEBOUNCE, hz for COALESCE_THROTTLE
+        """
+        with self._coalesce_lock:
+            if policy is None:
+                self._coalesce.pop(event_type, None)
+            else:
+                self._coalesce[event_type] = (policy, value)
+
+    def _enqueue_coalesced(self, item, ckey, policy, value):
+        now = time.monotonic()
+        with self._coalesce_lock:
+            if policy == self.COALESCE_LATEST:
+                queued = self._latest.get(ckey)
+                if queued is not None:
+                    queued.item = item
+                    self.coalesced += 1
+                    return
+
+                queued = self._latest[ckey] = _Coalesced(ckey, item)
+
+            else:
+                delayed = self._delayed.get(ckey)
+                if delayed is not None:
+                    if policy == self.COALESCE_DEBOUNCE:
+                        delayed[0] = now + value / 1000.0
+                    delayed[1] = item
+                    self.coalesced += 1
+                    return
+
+                if policy == self.COALESCE_DEBOUNCE:
+                    due = now + value / 1000.0
+                else:
+                    due = max(now, self._throttle_last.get(ckey, 0.0) + 1.0 / value)
+                self._delayed[ckey] = [due, item, policy]
+
+        if policy == self.COALESCE_LATEST:
+            self._q.put(queued)  # outside the lock, put() can block on a full lane
+        else:
+            self._sched.call_at(due, self._delayed_due, ckey)
+
+    def _delayed_due(self, ckey):
+        # scheduler timer of a debounced/throttled event, a debounce that was
+        # pushed back by newer events is rescheduled, one timer per burst
+        now = time.monotonic()
+        with self._coalesce_lock:
+            due, item, policy = self._delayed[ckey]
+            if due > now:
+                self._sched.call_at(due, self._delayed_due, ckey)
+                return
+
+            del self._delayed[ckey]
+            if policy == self.COALESCE_THROTTLE:
+                self._throttle_last[ckey] = now
+
+        self._dispatch(item)
+
+    def call_later(self, delay, fn, *args):
+        """ Call fn(*args) on the worker thread, under the lock, after delay seconds
+
+        :return: ScheduledCall, cancel() to stop it
+        """
+        return self._sched.call_later(delay, self._locked_call, fn, *args)
+
+    def call_every(self, period, fn, *args, delay=None):
+        """ Call fn(*args) on the worker thread, under the lock, every period seconds
+
+        :return: ScheduledCall, cancel() to stop it
+        """
+        return self._sched.call_every(period, self._locked_call, fn, *args, delay=delay)
+
+    def enqueue_later(self, delay, item, period=None):
+        """ Handle event item after delay seconds, and every period seconds after that if period
+
+        :return: ScheduledCall, cancel() to stop it
+        """
+        return self._sched.call_at(time.monotonic() + delay, self._dispatch, item, period=period)
+
+    def _locked_call(self, fn, *args):
+        with self._lock:
+            fn(*args)
+
+    def _take_latest(self, queued):
+        with self._coalesce_lock:
+            del self._latest[queued.ckey]
+            return queued.item
+
+    def shutdown(self):
+        item_dict = {"type": self.EVENT_SHUTDOWN, "from": "shutdown"}
+        self.enqueue(item_dict)
+        self.join()
+
+    def is_stopped(self):
+        return self._stop_event.is_set()
+
+    def _event_shutdown(self, item=None):
+        self._stop_event.set()
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True, cancel_futures=True)
+        logger.info(f"{self.name} shutdown")
+
+    def _offload(self, item):
+        fn, done_type = self.OFFLOAD[item["type"]]
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(self._max_processes, mp_context=get_context("spawn"))
+
+        if item.__class__ is WorkerEvent:
+            args = {"type": item.type, "key": item.key}
+        else:
+            args = {k: v for k, v in item.items() if k != "data"}
+        shm, payload = _offload_payload(item["data"])
+        future = self._process_pool.submit(_offload_call, fn, shm.name, payload, args)
+
+        def _done(f):
+            shm.close()
+            shm.unlink()
+            if f.cancelled():  # shutdown
+                return
+
+            error = f.exception()
+            self.enqueue({"type": done_type, "item": args,
+                          "result": None if error else f.result(), "error": error})
+
+        future.add_done_callback(_done)
+
+    def subc_events(self, item):
+        return False
+
+    def _dispatch(self, item):
+        try:
+            logger.debug(item)
+
+            event_type = item.type if item.__class__ is WorkerEvent else item["type"]
+            handler = self._handlers.get(event_type)
+            if self.metrics is not None:
+                t0 = time.perf_counter()
+            with self._lock:
+                if handler is not None:
+                    handler(item)
+
+                elif event_type in self.OFFLOAD:
+                    self._offload(item)
+
+                elif self.subc_events(item):
+                    pass
+
+                else:
+                    logger.error("Unknown event: {}".format(item["type"]))
+
+            if self.metrics is not None:
+                self.metrics.handled_event(event_type, time.perf_counter() - t0)
+
+        except Exception as e:
+            logger.error("Error processing event {}, {}".format(e, item["type"]))
+            traceback.print_exc()
+
+    def run(self):
+        logger.info(f"{self.name} run thread started")
+        q_get = self._q.get
+        sched = self._sched
+        while not self.is_stopped():
+
+            # one wait for the next event or the next timer, whichever is first
+            try:
+                item = q_get(block=True, timeout=sched.timeout())
+            except queue.Empty:
+                item = _WAKE
+
+            sched.run_due()
+
+            if item is not _WAKE:
+                if item.__class__ is _Coalesced:
+                    item = self._take_latest(item)
+                self._dispatch(item)
+
+        logger.info(f"{self.name} run thread stopped")
+
+
+class AsyncWorkerBase(Thread):
+    """ WorkerBase whose thread runs an asyncio event loop
+    - events are handled in order, one at a time, by coroutine methods
+      registered with @handles(event type), or by the coroutine
+      subc_events(item), which returns NotImplemented for an unknown event.
+      The handler return value is the event result.  Handlers run on the
+      loop, no lock is needed.
+    - coroutines can run on the worker's loop, see submit(), ie device
+      sessions, many sessions can share the one loop
+    - queueing,
+        await enqueue(item)      from a coroutine, on any loop
+        await request(item)      from a coroutine, returns the event result
+        enqueue_threadsafe(item) from other threads, ie DPG callbacks, does not block
+        request_threadsafe(item) from other threads, returns a concurrent.futures.Future
+    - maxsize bounds the queue, coroutines wait for room, other threads never wait
+    - coroutines still running at shutdown are cancelled
+
+    """
+
+    EVENT_SHUTDOWN = "EVENT_SHUTDOWN"
+
+    _HANDLERS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _register_handlers(cls)
+
+    def __init__(self, name="Worker", maxsize=0):
+        super().__init__()
+
+        self._loop = asyncio.new_event_loop()
+        self._q = asyncio.Queue(maxsize)  # (item, future or None), used on the loop only
+        self._stop_event = Event()
+        self._handlers = {t: getattr(self, n) for t, n in self._HANDLERS.items()}
+
+        self.name = name
+        self.start()
+
+    async def _put(self, item, future=None):
+        await self._q.put((item, future))
+
+    def _on_loop(self):
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def enqueue(self, item_dict: dict):
+        logger.debug(item_dict)
+        if self._on_loop():
+            await self._put(item_dict)
+        else:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._put(item_dict), self._loop))
+
+    async def request(self, item_dict: dict):
+        """ Queue an event and wait for its result
+
+        :param item_dict: event
+        :return: the subc_events() result, handler exceptions are raised here
+        """
+        logger.debug(item_dict)
+        if self._on_loop():
+            future = self._loop.create_future()
+            await self._put(item_dict, future)
+            return await future
+        return await asyncio.wrap_future(self.request_threadsafe(item_dict))
+
+    def enqueue_threadsafe(self, item_dict: dict):
+        logger.debug(item_dict)
+        asyncio.run_coroutine_threadsafe(self._put(item_dict), self._loop)
+
+    def request_threadsafe(self, item_dict: dict):
+        """ Queue an event from another thread
+
+        :param item_dict: event
+        :return: concurrent.futures.Future of the subc_events() result
+        """
+        async def _request():
+            future = self._loop.create_future()
+            await self._put(item_dict, future)
+            return await future
+
+        return asyncio.run_coroutine_threadsafe(_request(), self._loop)
+
+    def submit(self, coro):
+        """ Run a coroutine on the worker's event loop, from any thread
+
+        :param coro: coroutine
+        :return: concurrent.futures.Future of the coroutine result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def shutdown(self):
+        """ Stop the worker and wait for it, do not call from the worker's loop """
+        item_dict = {"type": self.EVENT_SHUTDOWN, "from": "shutdown"}
+        self.enqueue_threadsafe(item_dict)
+        self.join()
+
+    def is_stopped(self):
+        return self._stop_event.is_set()
+
+    def _event_shutdown(self):
+        self._stop_event.set()
+        logger.info(f"{self.name} shutdown")
+
+    async def subc_events(self, item):
+        return NotImplemented
+
+    async def _main(self):
+        while not self.is_stopped():
+            item, future = await self._q.get()
+            logger.debug(item)
+
+            try:
+                event_type = item.type if item.__class__ is WorkerEvent else item["type"]
+                handler = self._handlers.get(event_type)
+                if event_type == self.EVENT_SHUTDOWN:
+                    result = self._event_shutdown()
+
+                elif handler is not None:
+                    result = await handler(item)
+
+                else:
+                    result = await self.subc_events(item)
+                    if result is NotImplemented:
+                        raise KeyError("Unknown event: {}".format(item["type"]))
+
+                if future is not None and not future.done():
+                    future.set_result(result)
+
+            except Exception as e:
+                logger.error("Error processing event {}, {}".format(e, item["type"]))
+                if future is not None and not future.done():
+                    future.set_exception(e)
+                else:
+                    traceback.print_exc()
+
+    def run(self):
+        logger.info(f"{self.name} run thread started")
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        finally:
+            self._loop.close()
+
+        logger.info(f"{self.name} run thread stopped")
+
+
+class PoolWorkerBase(object):
+    """ WorkerBase that handles events on a ThreadPoolExecutor
+    - every event has an ordering key, see key(), default item["key"], ie
+      the widget tag or the device id
+    - events with the same key are handled one at a time, in order, events
+      with different keys are handled in parallel on max_workers threads
+    - there is no global lock, handlers for different keys run at the same
+      time, so protect any state they share
+    - a key is drained at most BURST events at a time before its next
+      events go to the back of the pool, so a busy key can't starve others
+    - handlers are registered with @handles(event type), or subc_events(item)
+      returns True if the event was handled, like WorkerBase
+
+    """
+
+    EVENT_SHUTDOWN = "EVENT_SHUTDOWN"
+
+    BURST = 16
+
+    _HANDLERS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _register_handlers(cls)
+
+    def __init__(self, name="Worker", max_workers=None):
+        self._handlers = {t: getattr(self, n) for t, n in self._HANDLERS.items()}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._keys = {}  # key -> deque of pending events, a key is present while it is scheduled
+        self._keys_lock = Lock()  # only guards self._keys, never held while handling
+        self._stop_event = Event()
+        self.name = name
+
+    def key(self, item):
+        """ ordering key of an event, override to derive it from the event """
+        return item.get("key")
+
+    def enqueue(self, item_dict: dict):
+        logger.debug(item_dict)
+        if self.is_stopped():
+            logger.error("{} stopped, event dropped: {}".format(self.name, item_dict["type"]))
+            return
+
+        key = self.key(item_dict)
+        with self._keys_lock:
+            pending = self._keys.get(key)
+            if pending is not None:
+                pending.append(item_dict)
+                return
+            self._keys[key] = deque((item_dict,))
+
+        self._pool.submit(self._drain, key)
+
+    def _drain(self, key):
+        # handles the pending events of one key, runs on a pool thread
+        for _ in range(self.BURST):
+            with self._keys_lock:
+                pending = self._keys[key]
+                if not pending:
+                    del self._keys[key]
+                    return
+                item = pending.popleft()
+
+            self._dispatch(item)
+
+        self._pool.submit(self._drain, key)
+
+    def _dispatch(self, item):
+        try:
+            handler = self._handlers.get(item.type if item.__class__ is WorkerEvent else item["type"])
+            if handler is not None:
+                handler(item)
+
+            elif not self.subc_events(item):
+                logger.error("Unknown event: {}".format(item["type"]))
+
+        except Exception as e:
+            logger.error("Error processing event {}, {}".format(e, item["type"]))
+            traceback.print_exc()
+
+    def shutdown(self):
+        """ Stop accepting events, and wait for the queued events to be handled """
+        self._stop_event.set()
+        while True:
+            with self._keys_lock:
+                if not self._keys:
+                    break
+            time.sleep(0.01)
+
+        self._pool.shutdown(wait=True)
+        logger.info(f"{self.name} shutdown")
+
+    def is_stopped(self):
+        return self._stop_event.is_set()
+
+    def subc_events(self, item):
+        return False
@@ -0,0 +1,180 @@
+import dearpygui.dearpygui as dpg
+from table_klass import Table
+import time
+
+
+class Histogram(object):
+    """ log2 histogram of durations
+    - bucket i counts durations below 2**i microseconds, percentiles are the
+      bucket upper bound (within 2x), count, total and max are exact
+    - add() is a few integer ops, cheap enough for every event
+
+    """
+
+    BUCKETS = 32
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """ upper bound of the p (0..100) percentile, seconds """
+        if not self.count:
+            return 0.0
+
+        target = self.count * p / 100.0
+        n = 0
+        for i, c in enumerate(self.counts):
+            n += c
+            if n >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        """ {"count", "mean", "p50", "p99", "max"}, times in seconds """
+        return {"count": self.count,
+                "mean": self.total / self.count if self.count else 0.0,
+                "p50": self.percentile(50),
+                "p99": self.percentile(99),
+                "max": self.max}
+
+
+class WorkerMetrics(object):
+    """ Metrics of a worker thread, WorkerBase(metrics=True) or Logger(metrics=True)
+    - wait, enqueue to dispatch latency of queued events, see the queue
+    - handlers, time spent per event type, Logger log lines are "log"
+    - enqueued / handled counters, queue depth and max depth
+    - updated on the producer threads and the worker thread without a lock,
+      a snapshot taken while they run can be off by an event
+
+    """
+
+    LOG = "log"  # Logger event type of log line batches
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.wait = Histogram()
+        self.handlers = {}  # event type -> Histogram
+        self.enqueued = 0
+        self.handled = 0
+        self.depth = 0
+        self.max_depth = 0
+        self._rate_time = time.monotonic()
+        self._rate_handled = 0
+
+    def queued(self, depth):
+        """ an event was queued, depth is the queue depth after it """
+        self.enqueued += 1
+        self.depth = depth
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def dequeued(self, wait, depth):
+        """ an event was taken from the queue after waiting wait seconds """
+        self.wait.add(wait)
+        self.depth = depth
+
+    def handled_event(self, event_type, seconds, n=1):
+        """ n events of event_type were handled in seconds """
+        h = self.handlers.get(event_type)
+        if h is None:
+            h = self.handlers[event_type] = Histogram()
+        h.add(seconds)
+        self.handled += n
+
+    def snapshot(self):
+        """ Current metrics
+
+        :return: dict, rate is events handled per second since the last snapshot,
+                 wait and handlers[type] are Histogram.summary()
+        """
+        now = time.monotonic()
+        handled = self.handled
+        elapsed = now - self._rate_time
+        rate = (handled - self._rate_handled) / elapsed if elapsed > 0 else 0.0
+        self._rate_time, self._rate_handled = now, handled
+
+        return {"enqueued": self.enqueued,
+                "handled": handled,
+                "rate": rate,
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+                "wait": self.wait.summary(),
+                "handlers": {t: h.summary() for t, h in list(self.handlers.items())}}
+
+
+class MetricsTable(Table):
+    """ Table of WorkerMetrics, one row for the queue wait and one per event type
+    - event types are fixed when the table is created, see tables_01.py
+
+    """
+
+    w = [160, 70, 70, 70, 70]
+    h = ["Event", "   Count", " Mean ms", "  p99 ms", "  Max ms"]
+
+    FMT_COUNT = "{:8,d}"
+    FMT_MS = "{:8,.3f}"
+
+    def __init__(self, name, event_types, **kwargs):
+        super().__init__(name, **kwargs)
+        self._event_types = ["wait"] + list(event_types)
+        zero_ms = self.FMT_MS.format(0.0)
+        self.t = [[t, self.FMT_COUNT.format(0), zero_ms, zero_ms, zero_ms] for t in self._event_types]
+        self.tags = [[None, f"{r}_count", f"{r}_mean", f"{r}_p99", f"{r}_max"]
+                     for r in range(len(self._event_types))]
+
+    def update(self, snapshot):
+        rows = [snapshot["wait"]] + [snapshot["handlers"].get(t) for t in self._event_types[1:]]
+        values = []
+        for r, s in enumerate(rows):
+            if s is None:
+                continue
+            values += [(f"{r}_count", self.FMT_COUNT.format(s["count"])),
+                       (f"{r}_mean", self.FMT_MS.format(s["mean"] * 1000)),
+                       (f"{r}_p99", self.FMT_MS.format(s["p99"] * 1000)),
+                       (f"{r}_max", self.FMT_MS.format(s["max"] * 1000))]
+        self.set_cell_values_by_name(values)
+
+
+def metrics_window(worker, event_types, tag_root="metrics", label="Worker Stats", period=1.0, **kwargs):
+    """ Create a DPG window that shows the metrics of worker
+    - worker is a WorkerBase or Logger created with metrics=True, the window
+      is refreshed every period seconds by a timer on the worker's thread
+
+    :param worker: WorkerBase or Logger
+    :param event_types: event types that get a row, ie list(worker._HANDLERS)
+    :param tag_root: tag prefix of the window items
+    :param label: window label
+    :param period: refresh period, seconds
+    :param kwargs: passed to dpg.window
+    :return: ScheduledCall of the refresh timer, cancel() to stop it
+    """
+    with dpg.window(label=label, **kwargs):
+        dpg.add_text("", tag=f"{tag_root}_summary")
+        table = MetricsTable(f"{tag_root}_table", event_types,
+                             header_row=True, row_background=True,
+                             borders_innerH=True, borders_outerH=True,
+                             borders_innerV=True, borders_outerV=True)
+        table.create()
+
+    def _refresh():
+        snapshot = worker.metrics.snapshot()
+        dpg.set_value(f"{tag_root}_summary",
+                      f"handled {snapshot['handled']:,}, {snapshot['rate']:,.0f}/s, "
+                      f"depth {snapshot['depth']:,}, max depth {snapshot['max_depth']:,}")
+        table.update(snapshot)
+
+    return worker.call_every(period, _refresh)